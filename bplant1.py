@@ -1,18 +1,22 @@
-from PIL import Image, ImageDraw
+from PIL import Image
 import time
+import deep_zoom as dz
+import genetics as gn
+import offlattice as ol
+import particle_tracing as pt
 import planar_utils as pu
 import plant_growth as pg
+import voxel_growth as vg
+import argparse
+import random
 import sys
-import yaml
 
 ##################################
 # TODO NOTES AND IDEAS
 
-# get the plant attribute configs from a "genetics" file instead of having them hard-coded here
-# add command-line configs for grow amount, logging flag and increment, and inremental output flags and increment, and debug level
+# add command-line configs for logging flag and increment, and inremental output flags and increment, and debug level
 # put separated incrementals into a subfolder in the greenhouse
 # write usage documentation in the README
-# fancier movement strategies
 # other fanciness: nodes, needles/sticks, flowers, fruit, leaves, buds, color shifting, etc.
 
 ##################################
@@ -35,46 +39,42 @@ PROGRESS_LOGGING_DEFAULT_INTERVAL = 100
 DO_INCREMENTAL_OUTPUT = True
 DO_INCREMENTAL_OUTPUT_SEPARATED = False
 INCREMENTAL_OUTPUT_DEFAULT_INTERVAL = 400
+DO_DEEP_ZOOM_OUTPUT = False
+DEEP_ZOOM_TILE_SIZE = 256
+MULTIRES_COMPARE_MASS_TOLERANCE = 0.1 # the multires speedup is only reported against a direct plant of about the same mass
 
-COLOR_RGBA_BG = (0,0,0,255) #### TODO: remove this once image is set up from plant genetics!
-COLOR_RGB_PARTICLE_TRACE = (128,0,0)
-COLOR_RGB_PARTICLE_CUR = (0,0,128)
 
 PROGRESS_LOGGING_INTERVAL = PROGRESS_LOGGING_DEFAULT_INTERVAL
 INCREMENTAL_OUTPUT_INTERVAL = INCREMENTAL_OUTPUT_DEFAULT_INTERVAL
 
 ##################################
-# PLANT IMAGE DATA
 
-IMAGE_WIDTH = 256
-IMAGE_HEIGHT = 256
-IMAGE = Image.new('RGBA', (IMAGE_WIDTH, IMAGE_HEIGHT), COLOR_RGBA_BG)
-IMAGE_BOUNDING_BOX = ((0, 0), (IMAGE_WIDTH-1, IMAGE_HEIGHT-1))
-PIXELS = IMAGE.load()
-DRAW = ImageDraw.Draw(IMAGE)
+def setup_plant_image(plant_genetics):
+    """
+    Create a blank image to grow a plant on, sized and colored according to the plant genetics
 
-##################################
+    Parameters:
+    - plant_genetics: the compiled configuration of how the plant grows (see genetics.compile_plant_genetics)
 
-def setup_derived_plant_genetics(plant_genetics):
+    Returns:
+    - an RGBA image filled with the background color
     """
-    Add derived plant genetics
+    return Image.new('RGBA', (plant_genetics.width, plant_genetics.height), plant_genetics.color_rgba_bg)
+
+
+def get_image_bounding_box(image):
+    """
+    Get the bounding box of the given image
 
     Parameters:
-    - plant_genetics: configuration of how the plant grows
+    - image: the image to get the bounds of
 
     Returns:
-    - None
+    - a tuple of (upper left point, lower right point) covering every pixel of the image
     """
-    plant_genetics['color_rgb_bg'] = tuple(plant_genetics['color_rgb_bg'])
-    plant_genetics['color_rgba_bg'] = tuple(plant_genetics['color_rgba_bg'])
-    plant_genetics['color_rgb_plant'] = tuple(plant_genetics['color_rgb_plant'])
+    im_w, im_h = image.size
+    return ((0, 0), (im_w - 1, im_h - 1))
 
-    plant_genetics['dead_colors'] = [plant_genetics['color_rgb_bg'], COLOR_RGB_PARTICLE_TRACE, COLOR_RGB_PARTICLE_CUR]
-    plant_genetics['max_particle_inject_inner_radius'] = int(max(plant_genetics['width'], plant_genetics['height']) * .8) # inner radius for injection can go most of the way to the edge
-    if plant_genetics['seed_location'] == 'BOTTOM_CENTER':
-        plant_genetics['particle_inject_center'] = (plant_genetics['width'] // 2, plant_genetics['height'] - 1)
-    else: # default is bottom center
-        plant_genetics['particle_inject_center'] = (plant_genetics['width'] // 2, plant_genetics['height'] - 1)
 
 def lpad(tnum, n):
     """
@@ -110,11 +110,12 @@ def handle_progress_logging(growth_counter, grow_max, tmark_last):
     return tmark_last
 
 
-def handle_incremental_output(incremental_output_counter, growth_counter, incremental_output_file_base):
+def handle_incremental_output(image, incremental_output_counter, growth_counter, incremental_output_file_base):
     """
     Handle output of the image to file at a given interval
 
     Parameters:
+    - image: the image to output
     - incremental_output_counter: the number of growth actions that have been performed
     - growth_counter: the number of growth actions that have been performed
     - incremental_output_file_base: the base name of the file to output to
@@ -122,92 +123,509 @@ def handle_incremental_output(incremental_output_counter, growth_counter, increm
     Returns:
     - the new incremental output counter value
     """
-    if DO_INCREMENTAL_OUTPUT and growth_counter % INCREMENTAL_OUTPUT_INTERVAL == 0:
+    if DO_INCREMENTAL_OUTPUT and incremental_output_file_base and growth_counter % INCREMENTAL_OUTPUT_INTERVAL == 0:
         incremental_output_counter += 1
         incremental_output_path = f"greenhouse/{incremental_output_file_base}.png"
         if DO_INCREMENTAL_OUTPUT_SEPARATED:
             incremental_output_path = f"greenhouse/{incremental_output_file_base}_{lpad(incremental_output_counter,4)}.png"
         print(f"Saving incremental output to {incremental_output_path}")
-        IMAGE.save(incremental_output_path)
+        image.save(incremental_output_path)
     return incremental_output_counter
 
+
+
+def save_final_output(image, plant_genetics, final_output_base, visit_counts=None):
+    """
+    Save the grown plant, either as a single png or, for big images, as a Deep Zoom tile pyramid
+
+    Parameters:
+    - image: the image of the grown plant
+    - plant_genetics: the compiled configuration of how the plant grows (see genetics.compile_plant_genetics)
+    - final_output_base: the path to save to, without an extension
+    - visit_counts: the visit count layer of the particle tracing, saved as a heatmap over the plant in <final_output_base>_trace.png; None if not tracing
+
+    Returns:
+    - the path of the saved image (the png, or the .dzi file of the tile pyramid)
+    """
+    if visit_counts is not None:
+        trace_output_path = f"{final_output_base}_trace.png"
+        pt.render_visit_heatmap(image, visit_counts).save(trace_output_path)
+        print(f"Particle trace heatmap saved to {trace_output_path}")
+    if DO_DEEP_ZOOM_OUTPUT:
+        tile_count = dz.export_deep_zoom(image, final_output_base, plant_genetics.color_rgb_bg, DEEP_ZOOM_TILE_SIZE)
+        debug(f"{tile_count} deep zoom tiles saved", DEBUG_LOW)
+        return f"{final_output_base}.dzi"
+    final_output_path = f"{final_output_base}.png"
+    image.save(final_output_path)
+    return final_output_path
+
         
 ##################################
 ##################################
 ##################################
 # MAIN
 
-def main(plant_genetics):
+def grow_plant(plant_genetics, image, plant_radius, incremental_output_file_base=None, visit_counts=None):
+    """
+    Grow a plant on an image that already holds its seed.
+
+    Parameters:
+    - plant_genetics: the compiled configuration of how the plant grows (see genetics.compile_plant_genetics)
+    - image: the image to grow the plant on
+    - plant_radius: the radius of the plant before growing (usually the seed radius)
+    - incremental_output_file_base: the base name of incremental output files; None to skip incremental output
+    - visit_counts: a visit count layer (see pt.setup_visit_counts) to trace the particles on; None to skip tracing
 
-    pg.setup_plant_seed_bottom_center(IMAGE,plant_genetics['seed_radius'], plant_genetics['color_rgb_plant'])    
+    Returns:
+    - a list of the (x,y) points at which growth occurred, in the order the growth happened
+    """
+    pixels = image.load()
+    bounding_box = get_image_bounding_box(image)
 
     particle_inject_inner_radius, particle_inject_outer_radius, particle_max_movement_radius = pg.get_particle_action_radii_from_base_radius(
-        plant_genetics['seed_radius'],
+        plant_radius,
         plant_genetics
         )
 
-    tmark_first, tmark_last = time.time(), time.time()
-
-    particles = pg.setup_particle_list(plant_genetics['particle_count'], plant_genetics['particle_inject_center'], particle_inject_inner_radius, particle_inject_outer_radius, IMAGE_BOUNDING_BOX)
+    particles = pg.setup_particle_list(plant_genetics.particle_count, plant_genetics.particle_inject_center, particle_inject_inner_radius, particle_inject_outer_radius, bounding_box)
     debug(f"{len(particles)} particles injected")
     debug(f"particles: {particles}", DEBUG_DEVELOPING)
 
-    # create incremental output file base name, based on growth size and timestamp
-    incremental_output_file_base = f"plant_{plant_genetics['grow_amount']}_{tmark_first}_incr"
-    debug(f"incremental_output_file_base: {incremental_output_file_base}", DEBUG_DEVELOPING)
+    # the genetics the loop reads on every step, hoisted into locals
+    grow_amount, inject_center, dead_colors, plant_color = plant_genetics.grow_amount, plant_genetics.particle_inject_center, plant_genetics.dead_colors, plant_genetics.color_rgb_plant
+    move_particle, movement_model, grow_at = plant_genetics.move_particle, plant_genetics.movement_model, plant_genetics.grow_at
+    absorb_at_edges = plant_genetics.movement_absorb_at_edges
 
     # MAIN LOOP
     ## while the plant is growing, get a particle, move it, and append it back on the list; handle growth and out-of-bounds replacement as needed
+    tmark_last = time.time()
     growth_counter = 0
     incremental_output_counter = 0
-    plant_radius = plant_genetics['seed_radius']
-    while growth_counter < plant_genetics['grow_amount']:
+    visit_buffer = []
+    deposits = []
+    while growth_counter < grow_amount:
         particle = particles.pop(0)
         debug(f"acting on particle {particle}", DEBUG_EXTREME)
 
-        if DO_PARTICLE_TRACING:
-            PIXELS[particle[0],particle[1]] = COLOR_RGB_PARTICLE_TRACE
-
-        particle = pg.move_particle(particle, IMAGE_BOUNDING_BOX)
+        particle = move_particle(particle, bounding_box, movement_model)
+        if visit_counts is not None:
+            pt.record_visit(visit_counts, visit_buffer, particle)
 
-        if pg.is_adjacent_to_live_pixel(particle, PIXELS, plant_genetics['dead_colors'], IMAGE_BOUNDING_BOX):
+        if pg.is_adjacent_to_live_pixel(particle, pixels, dead_colors, bounding_box):
             growth_counter += 1
-            pg.grow_at(particle, PIXELS, plant_genetics['color_rgb_plant'])
+            grow_at(particle, pixels, plant_color)
+            deposits.append(particle)
             debug(f"grew at {particle}", DEBUG_VERY_RICH)
 
             new_radii = pg.grow_radii(particle, plant_radius, plant_genetics)
             if new_radii is not None:
                 plant_radius, particle_inject_inner_radius, particle_inject_outer_radius, particle_max_movement_radius = new_radii
 
-            new_particle = pg.injected_particle_ring(plant_genetics['particle_inject_center'], particle_inject_inner_radius, particle_inject_outer_radius, IMAGE_BOUNDING_BOX)
+            new_particle = pg.injected_particle_ring(inject_center, particle_inject_inner_radius, particle_inject_outer_radius, bounding_box)
             particles.append(new_particle)
-            tmark_last = handle_progress_logging(growth_counter, plant_genetics['grow_amount'], tmark_last)
-            incremental_output_counter = handle_incremental_output(incremental_output_counter, growth_counter, incremental_output_file_base)
+            tmark_last = handle_progress_logging(growth_counter, grow_amount, tmark_last)
+            incremental_output_counter = handle_incremental_output(image, incremental_output_counter, growth_counter, incremental_output_file_base)
         else:
             particle = pg.get_particle_within_movement_bounds_ring(particle,
-                                                                   plant_genetics['particle_inject_center'], 
+                                                                   inject_center, 
                                                                    particle_inject_inner_radius, 
                                                                    particle_inject_outer_radius, 
                                                                    particle_max_movement_radius, 
-                                                                   IMAGE_BOUNDING_BOX)
+                                                                   bounding_box,
+                                                                   absorb_at_edges)
             particles.append(particle)
-            if DO_PARTICLE_TRACING:
-                PIXELS[particle[0],particle[1]] = COLOR_RGB_PARTICLE_CUR
 
+    if visit_counts is not None:
+        pt.flush_visit_buffer(visit_counts, visit_buffer)
+    return deposits
+
+
+def main(plant_genetics):
+
+    image = setup_plant_image(plant_genetics)
+    pg.setup_plant_seed_bottom_center(image, plant_genetics.seed_radius, plant_genetics.color_rgb_plant)
+
+    tmark_first = time.time()
+
+    # create incremental output file base name, based on growth size and timestamp
+    incremental_output_file_base = f"plant_{plant_genetics.grow_amount}_{tmark_first}_incr"
+    debug(f"incremental_output_file_base: {incremental_output_file_base}", DEBUG_DEVELOPING)
+
+    visit_counts = pt.setup_visit_counts(*image.size) if DO_PARTICLE_TRACING else None
+    grow_plant(plant_genetics, image, plant_genetics.seed_radius, incremental_output_file_base, visit_counts)
+
+    total_elapsed_s = int((time.time() - tmark_first))
+    final_output_path = save_final_output(image, plant_genetics, f"greenhouse/plant_{plant_genetics.grow_amount}_{tmark_first}_{total_elapsed_s}", visit_counts)
+    print(f"Done. Total elapsed time for plant generation: {total_elapsed_s} s")
+    print(f"Image saved to {final_output_path}")
+    return final_output_path
+
+
+def grow_plant_from_mask(plant_genetics, image, seed_points, incremental_output_file_base=None, visit_counts=None):
+    """
+    Grow a plant from a seed of an arbitrary shape on an image that already holds the seed. Particles are injected at points picked from a band of distances from the nearest point of the plant, and bounded by their distance from it, using a distance field (and its injection band) that is updated as the plant grows.
+
+    Parameters:
+    - plant_genetics: the compiled configuration of how the plant grows (see genetics.compile_plant_genetics)
+    - image: the image to grow the plant on
+    - seed_points: a list of the (x,y) points of the seed
+    - incremental_output_file_base: the base name of incremental output files; None to skip incremental output
+    - visit_counts: a visit count layer (see pt.setup_visit_counts) to trace the particles on; None to skip tracing
+
+    Returns:
+    - a list of the (x,y) points at which growth occurred, in the order the growth happened
+    """
+    pixels = image.load()
+    bounding_box = get_image_bounding_box(image)
+    inject_inner_distance = plant_genetics.mask_inject_inner_distance
+    inject_outer_distance = plant_genetics.mask_inject_outer_distance
+    max_movement_distance = plant_genetics.mask_movement_max_distance
+
+    distance_field = pu.compute_distance_field(seed_points, image.size[0], image.size[1], max_movement_distance)
+    distance_band = pg.setup_distance_band(distance_field, inject_inner_distance, inject_outer_distance)
+
+    particles = [pg.injected_particle_distance_band(distance_band) for _ in range(plant_genetics.particle_count)]
+    debug(f"{len(particles)} particles injected")
+
+    grow_amount, plant_color, absorb_at_edges = plant_genetics.grow_amount, plant_genetics.color_rgb_plant, plant_genetics.movement_absorb_at_edges
+    move_particle, movement_model, grow_at = plant_genetics.move_particle, plant_genetics.movement_model, plant_genetics.grow_at
+
+    tmark_last = time.time()
+    growth_counter = 0
+    incremental_output_counter = 0
+    visit_buffer = []
+    deposits = []
+    while growth_counter < grow_amount:
+        particle = move_particle(particles.pop(0), bounding_box, movement_model)
+        if visit_counts is not None:
+            pt.record_visit(visit_counts, visit_buffer, particle)
+
+        # NOTE: a distance of 1 is adjacent to the plant, so the distance field doubles as the adjacency check; a particle
+        # at distance 0 is on the plant already (e.g. it drifted onto a seed point), and keeps walking
+        if distance_field[particle] == 1:
+            growth_counter += 1
+            grow_at(particle, pixels, plant_color)
+            deposits.append(particle)
+            pu.update_distance_field(distance_field, particle, max_movement_distance)
+            pg.update_distance_band(distance_band, distance_field, particle, max_movement_distance)
+            debug(f"grew at {particle}", DEBUG_VERY_RICH)
+
+            particles.append(pg.injected_particle_distance_band(distance_band))
+            tmark_last = handle_progress_logging(growth_counter, grow_amount, tmark_last)
+            incremental_output_counter = handle_incremental_output(image, incremental_output_counter, growth_counter, incremental_output_file_base)
+        else:
+            particles.append(pg.get_particle_within_movement_bounds_distance(particle, distance_field, distance_band,
+                                                                             max_movement_distance, bounding_box, absorb_at_edges))
+
+    if visit_counts is not None:
+        pt.flush_visit_buffer(visit_counts, visit_buffer)
+    return deposits
+
+
+def main_mask(plant_genetics):
+
+    image = setup_plant_image(plant_genetics)
+    seed_points = plant_genetics.seed_mask_points
+    pg.setup_plant_seed_mask(image.load(), seed_points, plant_genetics.color_rgb_plant)
+
+    tmark_first = time.time()
+    incremental_output_file_base = f"plant_mask_{plant_genetics.grow_amount}_{tmark_first}_incr"
+
+    visit_counts = pt.setup_visit_counts(*image.size) if DO_PARTICLE_TRACING else None
+    grow_plant_from_mask(plant_genetics, image, seed_points, incremental_output_file_base, visit_counts)
+
+    total_elapsed_s = int((time.time() - tmark_first))
+    final_output_path = save_final_output(image, plant_genetics, f"greenhouse/plant_mask_{plant_genetics.grow_amount}_{tmark_first}_{total_elapsed_s}", visit_counts)
+    print(f"Done. Total elapsed time for plant generation: {total_elapsed_s} s")
+    print(f"Image saved to {final_output_path}")
+    return final_output_path
+
+
+def scale_plant_genetics(plant_genetics, scale, **changes):
+    """
+    Get a copy of the plant genetics for growing on a grid scaled by the given factor; sizes, locations and distances are scaled, and the derived genetics are set up again.
+
+    Parameters:
+    - plant_genetics: configuration of how the plant grows
+    - scale: the factor to scale the grid by, e.g. 0.25 for a quarter size grid
+    - changes: other values to change in the copy, by key
+
+    Returns:
+    - the scaled plant genetics
+    """
+    return plant_genetics.replace(width=max(1, round(plant_genetics.width * scale)),
+                                  height=max(1, round(plant_genetics.height * scale)),
+                                  seed_radius=max(1, round(plant_genetics.seed_radius * scale)),
+                                  particle_movement_max_radius_extension=plant_genetics.particle_movement_max_radius_extension * scale,
+                                  movement_light_point=[int(v * scale) for v in plant_genetics.movement_light_point],
+                                  forest_seed_locations=[[int(v * scale) for v in location] for location in plant_genetics.forest_seed_locations],
+                                  **changes)
+
+
+def grow_plant_multires(plant_genetics, incremental_output_file_base=None):
+    """
+    Grow a plant coarse to fine: the trunk and major branches are grown on a downsampled grid, which is then upscaled to seed the next, finer level, and so on to the full size. Every level grows with the usual ring injection; a finer level carries on from the radius of the upscaled plant.
+
+    Parameters:
+    - plant_genetics: the compiled configuration of how the plant grows (see genetics.compile_plant_genetics); multires_levels is the number of levels, each twice the size of the last, and multires_grow_fractions is the share of the grow_amount spent at each level, coarsest first. The grow_amount is counted in full size pixels, so a coarse level, where each deposit is upscaled to a block of pixels, makes fewer deposits for its share
+    - incremental_output_file_base: the base name of incremental output files of the final level; None to skip incremental output
+
+    Returns:
+    - (image, level_times): the grown plant image, and a list of the seconds spent on each level
+    """
+    level_count = plant_genetics.multires_levels
+    grow_fractions = plant_genetics.multires_grow_fractions
+
+    image = None
+    level_times = []
+    for level in range(level_count):
+        tmark_level = time.time()
+        scale = 1 / 2 ** (level_count - 1 - level)
+        level_genetics = scale_plant_genetics(plant_genetics, scale, grow_amount=round(plant_genetics.grow_amount * grow_fractions[level] * scale * scale))
+        is_final_level = level == level_count - 1
+        debug(f"multires level {level}: {level_genetics.width}x{level_genetics.height}, {level_genetics.grow_amount} growth actions", DEBUG_LOW)
+
+        if image is None:
+            image = setup_plant_image(level_genetics)
+            pg.setup_plant_seed_bottom_center(image, level_genetics.seed_radius, level_genetics.color_rgb_plant)
+            grow_plant(level_genetics, image, level_genetics.seed_radius, incremental_output_file_base if is_final_level else None)
+        else:
+            image = image.resize((level_genetics.width, level_genetics.height), Image.NEAREST)
+            plant_radius = pg.get_plant_radius(pg.get_plant_points(image, level_genetics.dead_colors), level_genetics.particle_inject_center)
+            grow_plant(level_genetics, image, plant_radius, incremental_output_file_base if is_final_level else None)
+
+        level_times.append(time.time() - tmark_level)
+        print(f"multires level {level} ({image.size[0]}x{image.size[1]}): {int(level_times[-1] * 1000)} ms")
+    return image, level_times
+
+
+def main_multires(plant_genetics, compare_direct=False):
+
+    tmark_first = time.time()
+    incremental_output_file_base = f"plant_multires_{plant_genetics.grow_amount}_{tmark_first}_incr"
+
+    image, level_times = grow_plant_multires(plant_genetics, incremental_output_file_base)
+
+    total_elapsed_s = time.time() - tmark_first
+    final_output_path = save_final_output(image, plant_genetics, f"greenhouse/plant_multires_{plant_genetics.grow_amount}_{tmark_first}_{int(total_elapsed_s)}")
+    print(f"Done. Total elapsed time for multires plant generation: {total_elapsed_s:.1f} s ({', '.join(f'{t:.1f}' for t in level_times)} s per level)")
+    print(f"Image saved to {final_output_path}")
+
+    if compare_direct:
+        direct_image = setup_plant_image(plant_genetics)
+        pg.setup_plant_seed_bottom_center(direct_image, plant_genetics.seed_radius, plant_genetics.color_rgb_plant)
+        tmark_direct = time.time()
+        grow_plant(plant_genetics, direct_image, plant_genetics.seed_radius)
+        direct_elapsed_s = time.time() - tmark_direct
+        # NOTE: a speedup only means something between plants of the same mass
+        multires_mass = len(pg.get_plant_points(image, plant_genetics.dead_colors))
+        direct_mass = len(pg.get_plant_points(direct_image, plant_genetics.dead_colors))
+        print(f"Direct run: {direct_elapsed_s:.1f} s; plant mass {multires_mass} pixels multires, {direct_mass} pixels direct")
+        if abs(multires_mass - direct_mass) <= MULTIRES_COMPARE_MASS_TOLERANCE * direct_mass:
+            print(f"Multires speedup: {direct_elapsed_s / total_elapsed_s:.1f}x")
+        else:
+            print(f"The plant masses differ by more than {MULTIRES_COMPARE_MASS_TOLERANCE:.0%}, so no speedup is reported")
+    return final_output_path
+
+
+def main_offlattice(plant_genetics):
+
+    tmark_first = time.time()
+    progress = {'tmark_last': tmark_first}
+    def log_progress(growth_counter):
+        progress['tmark_last'] = handle_progress_logging(growth_counter, plant_genetics.grow_amount, progress['tmark_last'])
+
+    seed, deposits = ol.grow_plant_offlattice(plant_genetics, log_progress)
+    growth_elapsed_s = time.time() - tmark_first
+    print(f"Grew {len(deposits)} discs at {len(deposits) / growth_elapsed_s:.0f} deposits/s")
+
+    image = ol.render_offlattice(seed + deposits, plant_genetics.offlattice_deposit_radius,
+                                 plant_genetics.width, plant_genetics.height, plant_genetics.offlattice_render_scale,
+                                 plant_genetics.color_rgba_bg, plant_genetics.color_rgb_plant)
+
+    total_elapsed_s = int((time.time() - tmark_first))
+    final_output_path = save_final_output(image, plant_genetics, f"greenhouse/plant_offlattice_{plant_genetics.grow_amount}_{tmark_first}_{total_elapsed_s}")
+    print(f"Done. Total elapsed time for plant generation: {total_elapsed_s} s")
+    print(f"Image saved to {final_output_path}")
+    return final_output_path
+
+
+def main_voxel(plant_genetics):
+
+    tmark_first = time.time()
+    progress = {'tmark_last': tmark_first, 'growth_counter': 0}
+    def log_progress(growth_counter):
+        # NOTE: the voxel plant grows a walk block at a time, so the count jumps; log each time it passes a logging interval
+        if DO_PROGRESS_LOGGING and growth_counter // PROGRESS_LOGGING_INTERVAL > progress['growth_counter'] // PROGRESS_LOGGING_INTERVAL:
+            tmark_cur = time.time()
+            print(f"growth_counter: {growth_counter}/{plant_genetics.grow_amount}, {int((tmark_cur - progress['tmark_last']) * 1000)} ms elapsed for that increment")
+            progress['tmark_last'] = tmark_cur
+        progress['growth_counter'] = growth_counter
+
+    seed, deposits, voxel_store = vg.grow_plant_voxel(plant_genetics, log_progress)
+    growth_elapsed_s = time.time() - tmark_first
+    print(f"Grew {len(deposits)} voxels at {len(deposits) / growth_elapsed_s:.0f} deposits/s, in {voxel_store['chunk_count']} chunks")
+
+    voxels = vg.get_occupied_voxels(voxel_store)
     total_elapsed_s = int((time.time() - tmark_first))
-    final_output_path = f"greenhouse/plant_{plant_genetics['grow_amount']}_{tmark_first}_{total_elapsed_s}.png"
-    IMAGE.save(final_output_path)
+    final_output_base = f"greenhouse/plant_voxel_{plant_genetics.grow_amount}_{tmark_first}_{total_elapsed_s}"
+    vg.save_voxels_ply(voxels, f"{final_output_base}.ply", plant_genetics.height, plant_genetics.color_rgb_plant)
+    image = vg.render_voxel_projection(voxels, plant_genetics.width, plant_genetics.height, plant_genetics.depth,
+                                       plant_genetics.color_rgba_bg, plant_genetics.color_rgb_plant)
+    final_output_path = save_final_output(image, plant_genetics, final_output_base)
     print(f"Done. Total elapsed time for plant generation: {total_elapsed_s} s")
+    print(f"Voxels saved to {final_output_base}.ply, side view saved to {final_output_path}")
+    return f"{final_output_base}.ply"
+
+
+def grow_forest(plant_genetics, image, seed_centers, ownership, incremental_output_file_base=None, visit_counts=None):
+    """
+    Grow a forest of plants together on an image that already holds their seeds. All the plants share one pool of particles, and compete for them.
+
+    Parameters:
+    - plant_genetics: the compiled configuration of how the plants grow (see genetics.compile_plant_genetics)
+    - image: the image to grow the forest on
+    - seed_centers: a list of (x,y) tuples, the center of the seed of each plant
+    - ownership: a dict mapping (x,y) points to the index of the plant that owns them (as set up by pg.setup_plant_seeds); updated in place
+    - incremental_output_file_base: the base name of incremental output files; None to skip incremental output
+    - visit_counts: a visit count layer (see pt.setup_visit_counts) to trace the particles on; None to skip tracing
+
+    Returns:
+    - a list of the number of growth actions made by each plant
+    """
+    pixels = image.load()
+    bounding_box = get_image_bounding_box(image)
+    plant_colors = [plant_genetics.forest_plant_colors[i % len(plant_genetics.forest_plant_colors)] for i in range(len(seed_centers))]
+
+    plant_radii = [plant_genetics.seed_radius] * len(seed_centers)
+    plant_extents = [(center, *pg.get_particle_action_radii_from_base_radius(plant_genetics.seed_radius, plant_genetics)) for center in seed_centers]
+
+    particles = [pg.injected_particle_forest(plant_extents, bounding_box) for _ in range(plant_genetics.particle_count)]
+    debug(f"{len(particles)} particles injected")
+
+    grow_amount, absorb_at_edges = plant_genetics.grow_amount, plant_genetics.movement_absorb_at_edges
+    move_particle, movement_model, grow_at = plant_genetics.move_particle, plant_genetics.movement_model, plant_genetics.grow_at
+
+    tmark_last = time.time()
+    growth_counter = 0
+    growth_counts = [0] * len(seed_centers)
+    incremental_output_counter = 0
+    visit_buffer = []
+    while growth_counter < grow_amount:
+        particle = move_particle(particles.pop(0), bounding_box, movement_model)
+        if visit_counts is not None:
+            pt.record_visit(visit_counts, visit_buffer, particle)
+
+        owner = pg.get_adjacent_owner(particle, ownership)
+        if owner is not None and particle not in ownership:
+            growth_counter += 1
+            growth_counts[owner] += 1
+            grow_at(particle, pixels, plant_colors[owner])
+            ownership[particle] = owner
+            debug(f"plant {owner} grew at {particle}", DEBUG_VERY_RICH)
+
+            growth_radius = pu.distance_between(seed_centers[owner], particle)
+            if growth_radius > plant_radii[owner]:
+                plant_radii[owner] = growth_radius
+                plant_extents[owner] = (seed_centers[owner], *pg.get_particle_action_radii_from_base_radius(growth_radius, plant_genetics))
+
+            particles.append(pg.injected_particle_forest(plant_extents, bounding_box))
+            tmark_last = handle_progress_logging(growth_counter, grow_amount, tmark_last)
+            incremental_output_counter = handle_incremental_output(image, incremental_output_counter, growth_counter, incremental_output_file_base)
+        else:
+            particles.append(pg.get_particle_within_movement_bounds_forest(particle, plant_extents, bounding_box, absorb_at_edges))
+
+    if visit_counts is not None:
+        pt.flush_visit_buffer(visit_counts, visit_buffer)
+    return growth_counts
+
+
+def main_forest(plant_genetics):
+
+    image = setup_plant_image(plant_genetics)
+    seed_centers = plant_genetics.forest_seed_centers
+    plant_colors = [plant_genetics.forest_plant_colors[i % len(plant_genetics.forest_plant_colors)] for i in range(len(seed_centers))]
+    ownership = {}
+    pg.setup_plant_seeds(image.load(), seed_centers, plant_genetics.seed_radius, plant_colors, ownership, get_image_bounding_box(image))
+
+    tmark_first = time.time()
+    incremental_output_file_base = f"forest_{len(seed_centers)}_{plant_genetics.grow_amount}_{tmark_first}_incr"
+
+    visit_counts = pt.setup_visit_counts(*image.size) if DO_PARTICLE_TRACING else None
+    growth_counts = grow_forest(plant_genetics, image, seed_centers, ownership, incremental_output_file_base, visit_counts)
+
+    total_elapsed_s = int((time.time() - tmark_first))
+    final_output_path = save_final_output(image, plant_genetics, f"greenhouse/forest_{len(seed_centers)}_{plant_genetics.grow_amount}_{tmark_first}_{total_elapsed_s}", visit_counts)
+    print(f"Done. Total elapsed time for forest generation: {total_elapsed_s} s")
+    print(f"Growth actions per plant: {growth_counts}")
     print(f"Image saved to {final_output_path}")
+    return final_output_path
+
+
+def parse_args(argv):
+    """
+    Parse the command-line arguments
+
+    Parameters:
+    - argv: the list of command-line arguments, not including the script name
+
+    Returns:
+    - the parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Grow a digital plant")
+    parser.add_argument("--genetics", default=gn.PLANT_GENETICS_DEFAULT_PATH, help="path to the plant genetics yaml file")
+    parser.add_argument("--grow", type=int, help="how many grow actions to make this plant (overrides grow_amount from the genetics)")
+    parser.add_argument("--seed", type=int, help="seed for the random number generator, for reproducible plants")
+    parser.add_argument("--movement", choices=list(pg.MOVE_PARTICLE_FUNCTIONS), help="the particle movement strategy (overrides movement_strategy from the genetics)")
+    parser.add_argument("--seed-mask", metavar="MASK_PATH", help="grow from the seed shape in this mask image (light pixels are seed)")
+    parser.add_argument("--multires", action="store_true", help="grow coarse to fine over multires_levels levels")
+    parser.add_argument("--multires-compare", action="store_true", help="with --multires, also grow directly at full size and report the speedup")
+    parser.add_argument("--trace", action="store_true", help="trace where the particles wander, saved as a heatmap over the plant")
+    parser.add_argument("--deep-zoom", action="store_true", help="save the final plant as a Deep Zoom tile pyramid instead of a single png")
+    parser.add_argument("--off-lattice", action="store_true", help="grow with particles in continuous space instead of on the pixel grid")
+    parser.add_argument("--render-scale", type=float, help="with --off-lattice, output pixels per pixel of the growth space (overrides offlattice_render_scale from the genetics)")
+    parser.add_argument("--voxel", action="store_true", help="grow a 3D plant in a width x height x depth volume, saved as a PLY point cloud")
+    parser.add_argument("--forest", type=int, metavar="SEED_COUNT", help="grow a forest of this many plants together (overrides forest_seed_count from the genetics)")
+    return parser.parse_args(argv)
 
 
 if __name__ == "__main__":
-    with open("plant_genetics.yaml", 'r') as stream:
-        plant_genetics = yaml.safe_load(stream)
-    setup_derived_plant_genetics(plant_genetics)
+    args = parse_args(sys.argv[1:])
+    genetics_overrides = {}
+    if args.trace:
+        DO_PARTICLE_TRACING = True
+    if args.deep_zoom:
+        DO_DEEP_ZOOM_OUTPUT = True
+    if args.grow is not None:
+        genetics_overrides['grow_amount'] = args.grow
+    if args.seed is not None:
+        random.seed(args.seed)
+    if args.forest is not None:
+        genetics_overrides['forest_seed_count'] = args.forest
+        genetics_overrides['forest_seed_locations'] = []
+    if args.render_scale is not None:
+        genetics_overrides['offlattice_render_scale'] = args.render_scale
+    if args.movement is not None:
+        genetics_overrides['movement_strategy'] = args.movement
+    if args.seed_mask is not None:
+        genetics_overrides['seed_location'] = 'MASK'
+        genetics_overrides['seed_mask_path'] = args.seed_mask
+    try:
+        plant_genetics = gn.load_plant_genetics(args.genetics, **genetics_overrides)
+    except gn.GeneticsError as e:
+        sys.exit(f"Bad plant genetics in {args.genetics}: {e}")
 
     debug(f"plant_genetics: {plant_genetics}", DEBUG_DEVELOPING)
-    # sys.exit()
-
 
-    main(plant_genetics)
\ No newline at end of file
+    if args.forest is not None:
+        main_forest(plant_genetics)
+    elif args.off_lattice:
+        main_offlattice(plant_genetics)
+    elif args.voxel:
+        main_voxel(plant_genetics)
+    elif args.multires:
+        main_multires(plant_genetics, args.multires_compare)
+    elif plant_genetics.seed_location == 'MASK':
+        main_mask(plant_genetics)
+    else:
+        main(plant_genetics)
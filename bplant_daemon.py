@@ -0,0 +1,351 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+import bplant1
+import genetics as gn
+import plant_growth as pg
+
+##################################
+# A long-running plant generation daemon. A pool of warmed worker processes (interpreter started, PIL and yaml
+# imported, base genetics parsed) takes growth jobs from a file-drop spool directory, so that each plant only
+# pays for its own growth.
+#
+# SPOOL LAYOUT
+#   <spool>/incoming/<job_id>.json   - drop new jobs here; write to a temp name and rename, so a job is never read half-written
+#   <spool>/processing/<job_id>.json - jobs claimed by the daemon
+#   <spool>/progress/<job_id>.log    - progress of each job, streamed line by line while it grows
+#   <spool>/done/<job_id>.json       - result of each finished job (output image path, timing)
+#   <spool>/failed/<job_id>.json     - the job and the error, for jobs that could not be grown; for a job file that could
+#                                      not be read as json, the raw text of the file stands in for the job
+#
+# A job file is a json object like: {"seed": 7, "genetics": {"grow_amount": 300, "color_rgb_plant": [0, 200, 0]}}
+# where "genetics" overrides keys of the base plant genetics, and both keys are optional.
+
+SPOOL_DEFAULT_DIR = "greenhouse/spool"
+OUTPUT_DEFAULT_DIR = "greenhouse"
+POLL_DEFAULT_INTERVAL_S = 0.2
+SPOOL_SUBDIRS = ('incoming', 'processing', 'progress', 'done', 'failed')
+
+WORKER_BASE_GENETICS = None
+
+##################################
+
+def setup_spool(spool_dir):
+    """
+    Make sure all the folders of the spool exist
+
+    Parameters:
+    - spool_dir: the base folder of the spool
+
+    Returns:
+    - None
+    """
+    for subdir in SPOOL_SUBDIRS:
+        os.makedirs(os.path.join(spool_dir, subdir), exist_ok=True)
+
+
+def write_json_atomic(path, data):
+    """
+    Write the data as json to the given path, via a temp file and a rename so that readers never see a partial file
+
+    Parameters:
+    - path: the path to write to
+    - data: the json-serializable data to write
+
+    Returns:
+    - None
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as stream:
+        json.dump(data, stream)
+    os.replace(tmp_path, path)
+
+
+def submit_job(spool_dir, job_id, job):
+    """
+    Drop a growth job into the incoming folder of the spool
+
+    Parameters:
+    - spool_dir: the base folder of the spool
+    - job_id: the id of the job; used for the job, progress, and result file names
+    - job: a dict with optional "seed" and "genetics" (overrides) keys
+
+    Returns:
+    - the path of the job file
+    """
+    job_path = os.path.join(spool_dir, 'incoming', f"{job_id}.json")
+    write_json_atomic(job_path, job)
+    return job_path
+
+
+def claim_jobs(spool_dir, max_jobs):
+    """
+    Claim up to max_jobs jobs from the incoming folder of the spool, oldest first, by moving them to the processing folder
+
+    Parameters:
+    - spool_dir: the base folder of the spool
+    - max_jobs: the maximum number of jobs to claim
+
+    Returns:
+    - (claimed, failed): a list of (job_id, job) tuples of the claimed jobs, and a list of the ids of the jobs whose file couldn't be read (see fail_unreadable_job)
+    """
+    incoming_dir = os.path.join(spool_dir, 'incoming')
+    job_files = [f for f in os.listdir(incoming_dir) if f.endswith('.json')]
+    job_files.sort(key=lambda f: os.path.getmtime(os.path.join(incoming_dir, f)))
+    claimed = []
+    failed = []
+    for job_file in job_files[:max_jobs]:
+        job_id = job_file[:-len('.json')]
+        processing_path = os.path.join(spool_dir, 'processing', job_file)
+        try:
+            os.replace(os.path.join(incoming_dir, job_file), processing_path)
+        except FileNotFoundError:
+            # someone else claimed it first
+            continue
+        try:
+            with open(processing_path, 'r') as stream:
+                job = json.load(stream)
+        except (ValueError, OSError) as e:
+            # NOTE: ValueError covers malformed or truncated json (json.JSONDecodeError) as well as text that isn't utf-8
+            fail_unreadable_job(spool_dir, job_id, f"{type(e).__name__}: {e}")
+            failed.append(job_id)
+            continue
+        claimed.append((job_id, job))
+    return claimed, failed
+
+
+def fail_unreadable_job(spool_dir, job_id, error):
+    """
+    Move a claimed job whose file can't be read as json to the failed folder, so that one bad file can't stop the daemon
+
+    Parameters:
+    - spool_dir: the base folder of the spool
+    - job_id: the id of the job
+    - error: the error text of reading the job file
+
+    Returns:
+    - None
+    """
+    print(f"job {job_id} failed: {error}")
+    processing_path = os.path.join(spool_dir, 'processing', f"{job_id}.json")
+    try:
+        with open(processing_path, 'r', errors='replace') as stream:
+            job_text = stream.read()
+    except OSError:
+        job_text = None
+    write_json_atomic(os.path.join(spool_dir, 'failed', f"{job_id}.json"), {'job_text': job_text, 'error': error})
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(processing_path)
+
+
+def warm_worker(genetics_path):
+    """
+    Warm up a worker process: load and compile the base plant genetics once
+
+    Parameters:
+    - genetics_path: the path of the base plant genetics yaml file
+
+    Returns:
+    - None
+    """
+    global WORKER_BASE_GENETICS
+    WORKER_BASE_GENETICS = gn.load_plant_genetics(genetics_path)
+    # thumbnails don't need in-progress snapshots
+    bplant1.DO_INCREMENTAL_OUTPUT = False
+
+
+def run_growth_job(job_id, job, spool_dir, output_dir):
+    """
+    Grow a single plant for a job; progress is streamed to the progress file of the job
+
+    Parameters:
+    - job_id: the id of the job
+    - job: a dict with optional "seed" and "genetics" (overrides) keys
+    - spool_dir: the base folder of the spool
+    - output_dir: the folder to save the grown plant image in
+
+    Returns:
+    - a result dict for the job
+    """
+    tmark_start = time.time()
+    plant_genetics = WORKER_BASE_GENETICS.replace(**job.get('genetics', {}))
+    seed = job.get('seed')
+    random.seed(seed)
+
+    progress_path = os.path.join(spool_dir, 'progress', f"{job_id}.log")
+    with open(progress_path, 'w', buffering=1) as progress, contextlib.redirect_stdout(progress):
+        print(f"job {job_id} started, seed {seed}")
+        image = bplant1.setup_plant_image(plant_genetics)
+        pg.setup_plant_seed_bottom_center(image, plant_genetics.seed_radius, plant_genetics.color_rgb_plant)
+        deposits = bplant1.grow_plant(plant_genetics, image, plant_genetics.seed_radius)
+        output_path = os.path.join(output_dir, f"plant_{job_id}_{plant_genetics.grow_amount}_{seed}.png")
+        image.save(output_path)
+        elapsed_s = time.time() - tmark_start
+        print(f"job {job_id} done in {int(elapsed_s * 1000)} ms, saved to {output_path}")
+
+    return {'job_id': job_id, 'seed': seed, 'output_path': output_path, 'deposit_count': len(deposits), 'elapsed_s': elapsed_s}
+
+
+def _run_growth_job_safely(job_id, job, spool_dir, output_dir):
+    """
+    Run a growth job, catching any error so that a bad job can't take down the pool
+
+    Returns:
+    - a (job_id, result, error) tuple, where exactly one of result and error is None
+    """
+    try:
+        return job_id, run_growth_job(job_id, job, spool_dir, output_dir), None
+    except Exception:
+        return job_id, None, traceback.format_exc()
+
+
+def finish_job(spool_dir, job_id, result, error):
+    """
+    Record the outcome of a job in the done or failed folder, and release it from the processing folder
+
+    Parameters:
+    - spool_dir: the base folder of the spool
+    - job_id: the id of the job
+    - result: the result dict of the job, or None if it failed
+    - error: the error text of the job, or None if it succeeded
+
+    Returns:
+    - None
+    """
+    processing_path = os.path.join(spool_dir, 'processing', f"{job_id}.json")
+    if error is None:
+        write_json_atomic(os.path.join(spool_dir, 'done', f"{job_id}.json"), result)
+        os.remove(processing_path)
+    else:
+        print(f"job {job_id} failed:\n{error}")
+        with open(processing_path, 'r') as stream:
+            job = json.load(stream)
+        write_json_atomic(os.path.join(spool_dir, 'failed', f"{job_id}.json"), {'job': job, 'error': error})
+        os.remove(processing_path)
+
+
+def serve(spool_dir=SPOOL_DEFAULT_DIR, output_dir=OUTPUT_DEFAULT_DIR, genetics_path=gn.PLANT_GENETICS_DEFAULT_PATH,
+          worker_count=None, poll_interval_s=POLL_DEFAULT_INTERVAL_S, once=False):
+    """
+    Run the daemon: keep a pool of warmed workers busy with the jobs dropped into the spool
+
+    Parameters:
+    - spool_dir: the base folder of the spool
+    - output_dir: the folder to save grown plant images in
+    - genetics_path: the path of the base plant genetics yaml file
+    - worker_count: the number of worker processes; defaults to the number of CPUs
+    - poll_interval_s: how long to wait between checks of the incoming folder when idle
+    - once: if True, exit once the spool is drained instead of waiting for more jobs
+
+    Returns:
+    - the number of jobs finished (done or failed)
+    """
+    setup_spool(spool_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    worker_count = worker_count or os.cpu_count()
+    max_in_flight = worker_count * 2
+    finished_count = 0
+
+    with multiprocessing.Pool(worker_count, initializer=warm_worker, initargs=(genetics_path,)) as pool:
+        in_flight = []
+        try:
+            while True:
+                claimed, failed = claim_jobs(spool_dir, max_in_flight - len(in_flight))
+                finished_count += len(failed)
+                for job_id, job in claimed:
+                    print(f"claimed job {job_id}")
+                    in_flight.append(pool.apply_async(_run_growth_job_safely, (job_id, job, spool_dir, output_dir)))
+
+                still_in_flight = []
+                for async_result in in_flight:
+                    if async_result.ready():
+                        finish_job(spool_dir, *async_result.get())
+                        finished_count += 1
+                    else:
+                        still_in_flight.append(async_result)
+                in_flight = still_in_flight
+
+                if once and not in_flight and not os.listdir(os.path.join(spool_dir, 'incoming')):
+                    break
+                time.sleep(poll_interval_s if not in_flight else poll_interval_s / 10)
+        except KeyboardInterrupt:
+            print("Stopping; unfinished jobs stay in the processing folder")
+    return finished_count
+
+
+##################################
+# BENCHMARK
+
+def benchmark(plant_count, grow_amount, genetics_path=gn.PLANT_GENETICS_DEFAULT_PATH, worker_count=None):
+    """
+    Compare the throughput of growing plants with the one-shot CLI against the daemon
+
+    Parameters:
+    - plant_count: how many plants to grow with each approach
+    - grow_amount: how many grow actions to make each plant
+    - genetics_path: the path of the base plant genetics yaml file
+    - worker_count: the number of daemon worker processes; defaults to the number of CPUs
+
+    Returns:
+    - a (one-shot plants/sec, daemon plants/sec) tuple
+    """
+    script_path = os.path.abspath(bplant1.__file__)
+    genetics_path = os.path.abspath(genetics_path)
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.makedirs(os.path.join(work_dir, 'greenhouse'))
+        tmark_start = time.time()
+        for seed in range(plant_count):
+            subprocess.run([sys.executable, script_path, '--genetics', genetics_path, '--grow', str(grow_amount), '--seed', str(seed)],
+                           cwd=work_dir, check=True, stdout=subprocess.DEVNULL)
+        one_shot_rate = plant_count / (time.time() - tmark_start)
+
+        spool_dir = os.path.join(work_dir, 'spool')
+        setup_spool(spool_dir)
+        for seed in range(plant_count):
+            submit_job(spool_dir, f"bench{bplant1.lpad(seed, 5)}", {'seed': seed, 'genetics': {'grow_amount': grow_amount}})
+        tmark_start = time.time()
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            serve(spool_dir, os.path.join(work_dir, 'greenhouse'), genetics_path, worker_count, once=True)
+        daemon_rate = plant_count / (time.time() - tmark_start)
+
+    print(f"one-shot CLI: {one_shot_rate:.2f} plants/sec")
+    print(f"daemon ({worker_count or os.cpu_count()} workers): {daemon_rate:.2f} plants/sec")
+    print(f"speedup: {daemon_rate / one_shot_rate:.1f}x")
+    return one_shot_rate, daemon_rate
+
+
+def parse_args(argv):
+    """
+    Parse the command-line arguments
+
+    Parameters:
+    - argv: the list of command-line arguments, not including the script name
+
+    Returns:
+    - the parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Run a pool of warmed plant growing workers fed from a spool folder")
+    parser.add_argument("--spool", default=SPOOL_DEFAULT_DIR, help="the base folder of the job spool")
+    parser.add_argument("--output", default=OUTPUT_DEFAULT_DIR, help="the folder to save grown plant images in")
+    parser.add_argument("--genetics", default=gn.PLANT_GENETICS_DEFAULT_PATH, help="path to the base plant genetics yaml file")
+    parser.add_argument("--workers", type=int, help="number of worker processes (default: number of CPUs)")
+    parser.add_argument("--once", action="store_true", help="exit once the spool is drained")
+    parser.add_argument("--benchmark", type=int, metavar="PLANT_COUNT", help="measure plants/sec of the daemon against the one-shot CLI, then exit")
+    parser.add_argument("--benchmark-grow", type=int, default=200, help="grow amount of each benchmark plant")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    if args.benchmark:
+        benchmark(args.benchmark, args.benchmark_grow, args.genetics, args.workers)
+    else:
+        serve(args.spool, args.output, args.genetics, args.workers, once=args.once)
@@ -0,0 +1,152 @@
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+import math
+import numpy as np
+import os
+
+##################################
+# Deep Zoom (DZI) export of a plant image as a pyramid of tiles, as read by viewers such as OpenSeadragon.
+# Tiles that are entirely background are never built, downsampled, or written, so the cost follows the size of the
+# plant rather than the size of the canvas; viewers show the background where a tile is missing.
+
+DZI_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<Image xmlns="http://schemas.microsoft.com/deepzoom/2008" TileSize="{tile_size}" Overlap="0" Format="{tile_format}">
+  <Size Width="{width}" Height="{height}"/>
+</Image>
+"""
+
+def get_level_count(width, height):
+    """
+    Get the number of levels of the Deep Zoom pyramid for an image; level 0 is 1x1 and the last level is full size.
+
+    Parameters:
+    - width: the width of the image
+    - height: the height of the image
+
+    Returns:
+    - the number of levels
+    """
+    return math.ceil(math.log2(max(width, height))) + 1
+
+def get_level_size(width, height, level, level_count):
+    """
+    Get the size of an image at the given level of its Deep Zoom pyramid.
+
+    Parameters:
+    - width: the width of the image
+    - height: the height of the image
+    - level: the level of the pyramid
+    - level_count: the number of levels of the pyramid (see get_level_count)
+
+    Returns:
+    - a (width, height) tuple
+    """
+    scale = 2 ** (level_count - 1 - level)
+    return (math.ceil(width / scale), math.ceil(height / scale))
+
+def get_occupied_tiles(pixels_array, bg_rgb, tile_size):
+    """
+    Get the tiles of an image that hold anything other than the background.
+
+    Parameters:
+    - pixels_array: a (height, width, 4) uint8 numpy array of the RGBA image
+    - bg_rgb: the (r,g,b) background color
+    - tile_size: the width and height of a tile
+
+    Returns:
+    - a dict mapping the (column, row) of each occupied tile to its (up to tile_size x tile_size) numpy array
+    """
+    height, width = pixels_array.shape[:2]
+    # compare whole pixels as 32 bit words (with the alpha masked off); much faster than comparing channel by channel
+    rgb_mask = np.array([255, 255, 255, 0], dtype=np.uint8).view(np.uint32)[0]
+    bg_word = np.array(tuple(bg_rgb) + (0,), dtype=np.uint8).view(np.uint32)[0]
+    occupied = (np.ascontiguousarray(pixels_array).view(np.uint32)[:, :, 0] & rgb_mask) != bg_word
+    rows, columns = math.ceil(height / tile_size), math.ceil(width / tile_size)
+    padded = np.zeros((rows * tile_size, columns * tile_size), dtype=bool)
+    padded[:height, :width] = occupied
+    occupied_tiles = padded.reshape(rows, tile_size, columns, tile_size).any(axis=(1, 3))
+    return {(column, row): pixels_array[row * tile_size:(row + 1) * tile_size, column * tile_size:(column + 1) * tile_size]
+            for row, column in zip(*np.nonzero(occupied_tiles))}
+
+def downsample_tiles(tiles, level_size, tile_size, bg_rgba):
+    """
+    Build the occupied tiles of the next smaller level of the pyramid from the occupied tiles of a level; each new tile is a 2x2 block of tiles averaged down to half size.
+
+    Parameters:
+    - tiles: a dict mapping (column, row) to the numpy array of each occupied tile of a level
+    - level_size: the (width, height) of the next smaller level
+    - tile_size: the width and height of a tile
+    - bg_rgba: the (r,g,b,a) background color, used where a block has missing tiles
+
+    Returns:
+    - a dict mapping (column, row) to the numpy array of each occupied tile of the next smaller level
+    """
+    blocks = {}
+    for (column, row), tile in tiles.items():
+        blocks.setdefault((column // 2, row // 2), []).append((column % 2, row % 2, tile))
+
+    level_width, level_height = level_size
+    new_tiles = {}
+    for (column, row), children in blocks.items():
+        block = np.empty((tile_size * 2, tile_size * 2, 4), dtype=np.float32)
+        block[:, :] = bg_rgba
+        for dx, dy, tile in children:
+            block[dy * tile_size:dy * tile_size + tile.shape[0], dx * tile_size:dx * tile_size + tile.shape[1]] = tile
+        halved = block.reshape(tile_size, 2, tile_size, 2, 4).mean(axis=(1, 3))
+        new_width = min(tile_size, level_width - column * tile_size)
+        new_height = min(tile_size, level_height - row * tile_size)
+        new_tiles[(column, row)] = np.rint(halved[:new_height, :new_width]).astype(np.uint8)
+    return new_tiles
+
+def save_tile(tile, tile_path):
+    """
+    Save a tile to an image file.
+
+    Parameters:
+    - tile: the (height, width, 4) numpy array of the tile
+    - tile_path: the path to save the tile to; the format follows the extension
+
+    Returns:
+    - None
+    """
+    Image.fromarray(tile, 'RGBA').save(tile_path)
+
+def export_deep_zoom(image, output_base, bg_rgb, tile_size=256, tile_format='png', worker_count=None):
+    """
+    Export an image as a Deep Zoom pyramid: <output_base>.dzi describes it, and <output_base>_files/<level>/<column>_<row>.<tile_format> are the tiles. Only tiles holding something other than the background are written.
+
+    Parameters:
+    - image: the image to export
+    - output_base: the path of the export, without an extension
+    - bg_rgb: the (r,g,b) background color
+    - tile_size: the width and height of a tile
+    - tile_format: the image format (and extension) of the tiles
+    - worker_count: the number of threads encoding tiles; defaults to the number of CPUs
+
+    Returns:
+    - the number of tiles written
+    """
+    width, height = image.size
+    level_count = get_level_count(width, height)
+    bg_rgba = tuple(bg_rgb) + (255,)
+    if image.mode != 'RGBA':
+        image = image.convert('RGBA')
+    tiles = get_occupied_tiles(np.asarray(image), bg_rgb, tile_size)
+
+    tile_count = 0
+    with ThreadPoolExecutor(worker_count) as executor:
+        futures = []
+        for level in range(level_count - 1, -1, -1):
+            level_dir = f"{output_base}_files/{level}"
+            os.makedirs(level_dir, exist_ok=True)
+            for (column, row), tile in tiles.items():
+                futures.append(executor.submit(save_tile, tile, f"{level_dir}/{column}_{row}.{tile_format}"))
+            if level > 0:
+                tiles = downsample_tiles(tiles, get_level_size(width, height, level - 1, level_count), tile_size, bg_rgba)
+        for future in futures:
+            future.result()
+            tile_count += 1
+
+    with open(f"{output_base}.dzi", 'w') as stream:
+        stream.write(DZI_TEMPLATE.format(tile_size=tile_size, tile_format=tile_format, width=width, height=height))
+    return tile_count
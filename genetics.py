@@ -0,0 +1,315 @@
+import numbers
+import yaml
+import planar_utils as pu
+import plant_growth as pg
+
+##################################
+# Plant genetics: the yaml configuration of how a plant grows, validated against a schema and compiled once at start
+# up into a frozen PlantGenetics object. Derived values are computed and strategy names are resolved to the functions
+# that carry them out, so the growth loops read plain attributes (or locals) rather than looking up dict keys and
+# comparing strategy strings on every step.
+
+PLANT_GENETICS_DEFAULT_PATH = "plant_genetics.yaml"
+
+class GeneticsError(ValueError):
+    """
+    Raised for plant genetics that don't match the schema; the message names the offending key.
+    """
+    pass
+
+##################################
+# VALIDATORS - each checks one value and returns it in its runtime form (e.g. colors as tuples), or raises a GeneticsError
+
+def _integer(minimum=None, maximum=None):
+    def validate(key, value):
+        if isinstance(value, bool) or not isinstance(value, numbers.Integral):
+            raise GeneticsError(f"{key} must be an integer, got {value!r}")
+        if minimum is not None and value < minimum:
+            raise GeneticsError(f"{key} must be at least {minimum}, got {value!r}")
+        if maximum is not None and value > maximum:
+            raise GeneticsError(f"{key} must be at most {maximum}, got {value!r}")
+        return int(value)
+    return validate
+
+def _number(minimum=None, positive=False):
+    def validate(key, value):
+        if isinstance(value, bool) or not isinstance(value, numbers.Real):
+            raise GeneticsError(f"{key} must be a number, got {value!r}")
+        if minimum is not None and value < minimum:
+            raise GeneticsError(f"{key} must be at least {minimum}, got {value!r}")
+        if positive and value <= 0:
+            raise GeneticsError(f"{key} must be greater than 0, got {value!r}")
+        return value
+    return validate
+
+def _string():
+    def validate(key, value):
+        if not isinstance(value, str):
+            raise GeneticsError(f"{key} must be a string, got {value!r}")
+        return value
+    return validate
+
+def _choice(*options):
+    def validate(key, value):
+        # NOTE: strategy names are matched case-insensitively, e.g. 'ring' for RING
+        if not isinstance(value, str) or value.upper() not in options:
+            raise GeneticsError(f"{key} must be one of {', '.join(options)}, got {value!r}")
+        return value.upper()
+    return validate
+
+def _sequence(length, element):
+    def validate(key, value):
+        if not isinstance(value, (list, tuple)) or len(value) != length:
+            raise GeneticsError(f"{key} must be a list of {length} values, got {value!r}")
+        return tuple(element(key, v) for v in value)
+    return validate
+
+def _color(channels):
+    return _sequence(channels, _integer(0, 255))
+
+def _optional(element):
+    def validate(key, value):
+        return None if value is None else element(key, value)
+    return validate
+
+def _list_of(element, non_empty=False):
+    def validate(key, value):
+        if not isinstance(value, (list, tuple)) or (non_empty and not value):
+            raise GeneticsError(f"{key} must be a {'non-empty ' if non_empty else ''}list, got {value!r}")
+        # NOTE: a tuple, so that the compiled genetics can't be changed in place
+        return tuple(element(key, v) for v in value)
+    return validate
+
+##################################
+# SCHEMA
+
+PLANT_GENETICS_SCHEMA = {
+    'width': _integer(1),
+    'height': _integer(1),
+    'color_rgb_bg': _color(3),
+    'color_rgba_bg': _color(4),
+    'color_rgb_plant': _color(3),
+    'grow_amount': _integer(0),
+    'particle_count': _integer(1),
+    'seed_radius': _integer(0),
+    'seed_location': _choice('BOTTOM_CENTER', 'MASK'),
+    'seed_mask_path': _optional(_string()),
+    'mask_inject_inner_distance': _integer(1),
+    'mask_inject_outer_distance': _integer(1),
+    'mask_movement_max_distance': _integer(1),
+    'growth_strategy': _choice('RING'),
+    'deposit_strategy': _choice(*pg.GROW_AT_FUNCTIONS),
+    'movement_strategy': _choice(*pg.MOVE_PARTICLE_FUNCTIONS),
+    'movement_bias_strength': _number(0),
+    'movement_wind_direction': _sequence(2, _number()),
+    'movement_light_point': _sequence(2, _integer()),
+    'movement_bias_field': _list_of(_list_of(_sequence(2, _number()), non_empty=True), non_empty=True),
+    'particle_injection_max_radius_factor': _number(0),
+    'particle_injection_min_radius_factor': _number(0),
+    'particle_movement_max_radius_extension': _number(0),
+    'multires_levels': _integer(1),
+    'multires_grow_fractions': _list_of(_number(0), non_empty=True),
+    'offlattice_deposit_radius': _number(positive=True),
+    'offlattice_step_length': _number(positive=True),
+    'offlattice_render_scale': _number(positive=True),
+    'depth': _integer(1),
+    'voxel_particle_count': _integer(1),
+    'voxel_walk_block_steps': _integer(1),
+    'forest_seed_count': _integer(1),
+    'forest_seed_locations': _list_of(_sequence(2, _integer())),
+    'forest_plant_colors': _list_of(_color(3), non_empty=True),
+}
+
+# the defaults of the mode-specific genetics, which a plant genetics file may leave out; only the core genetics (those
+# of the plain ring growth of a single plant) are required
+PLANT_GENETICS_DEFAULTS = {
+    'seed_mask_path': None,
+    'mask_inject_inner_distance': 4,
+    'mask_inject_outer_distance': 12,
+    'mask_movement_max_distance': 24,
+    'deposit_strategy': 'DEPOSIT',
+    'movement_strategy': 'FULL_RANDOM_DRIFT',
+    'movement_bias_strength': 0.5,
+    'movement_wind_direction': [1, 0],
+    'movement_light_point': [0, 0],
+    'movement_bias_field': [[[0, 1]]],
+    'multires_levels': 3,
+    'multires_grow_fractions': [0.1, 0.3, 0.6],
+    'offlattice_deposit_radius': 0.5,
+    'offlattice_step_length': 1.0,
+    'offlattice_render_scale': 2,
+    'depth': 256,
+    'voxel_particle_count': 4096,
+    'voxel_walk_block_steps': 64,
+    'forest_seed_count': 3,
+    'forest_seed_locations': [],
+    'forest_plant_colors': [[0, 128, 0], [96, 160, 0], [0, 160, 112]],
+}
+
+# computed from the genetics when they are compiled (see compile_plant_genetics)
+DERIVED_GENETICS = (
+    'dead_colors',
+    'max_particle_inject_inner_radius',
+    'particle_inject_center',
+    'seed_mask_points',
+    'movement_model',
+    'movement_absorb_at_edges',
+    'forest_seed_centers',
+    'move_particle',
+    'grow_at',
+)
+
+##################################
+# COMPILED GENETICS
+
+class PlantGenetics:
+    """
+    Compiled plant genetics: the validated genetics plus the derived ones, as read-only attributes. Use replace to get a changed copy.
+    """
+    __slots__ = tuple(PLANT_GENETICS_SCHEMA) + DERIVED_GENETICS
+
+    def __init__(self, values):
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"plant genetics are frozen; use replace({name}=...) for a changed copy")
+
+    def __delattr__(self, name):
+        raise AttributeError("plant genetics are frozen")
+
+    def __reduce__(self):
+        # rebuilt from the validated genetics, e.g. when sent to a worker process
+        return (compile_plant_genetics, (self.as_dict(),))
+
+    def __repr__(self):
+        return f"PlantGenetics({self.as_dict()!r})"
+
+    def as_dict(self):
+        """
+        Get the (validated, not derived) genetics as a dict, e.g. to make a changed copy from.
+
+        Returns:
+        - a dict mapping each key of the schema to its value
+        """
+        return {key: getattr(self, key) for key in PLANT_GENETICS_SCHEMA}
+
+    def replace(self, **changes):
+        """
+        Get a copy of the genetics with some values changed; the copy is validated and its derived genetics are computed again.
+
+        Parameters:
+        - changes: the new values, by key
+
+        Returns:
+        - a new PlantGenetics
+        """
+        return compile_plant_genetics({**self.as_dict(), **changes})
+
+
+def validate_plant_genetics(raw_genetics):
+    """
+    Check the raw plant genetics against the schema; the mode-specific genetics that are left out take their defaults (see PLANT_GENETICS_DEFAULTS).
+
+    Parameters:
+    - raw_genetics: a dict of plant genetics, e.g. as read from the yaml file
+
+    Returns:
+    - a dict of the validated genetics, in their runtime form; raises a GeneticsError for a missing, unknown, or bad value
+    """
+    unknown_keys = sorted(set(raw_genetics) - set(PLANT_GENETICS_SCHEMA))
+    if unknown_keys:
+        raise GeneticsError(f"Unknown plant genetics: {', '.join(unknown_keys)}")
+    missing_keys = [key for key in PLANT_GENETICS_SCHEMA if key not in raw_genetics and key not in PLANT_GENETICS_DEFAULTS]
+    if missing_keys:
+        raise GeneticsError(f"Missing plant genetics: {', '.join(missing_keys)}")
+
+    raw_genetics = {**PLANT_GENETICS_DEFAULTS, **raw_genetics}
+    genetics = {key: validate(key, raw_genetics[key]) for key, validate in PLANT_GENETICS_SCHEMA.items()}
+
+    if genetics['particle_injection_min_radius_factor'] > genetics['particle_injection_max_radius_factor']:
+        raise GeneticsError("particle_injection_min_radius_factor must be at most particle_injection_max_radius_factor")
+    if not genetics['mask_inject_inner_distance'] <= genetics['mask_inject_outer_distance'] <= genetics['mask_movement_max_distance']:
+        raise GeneticsError("The mask distances must satisfy mask_inject_inner_distance <= mask_inject_outer_distance <= mask_movement_max_distance")
+    off_canvas = [location for location in genetics['forest_seed_locations']
+                  if not (0 <= location[0] < genetics['width'] and 0 <= location[1] < genetics['height'])]
+    if off_canvas:
+        raise GeneticsError(f"forest_seed_locations must be within the {genetics['width']}x{genetics['height']} image, got {list(off_canvas)}")
+    if len(genetics['multires_grow_fractions']) != genetics['multires_levels']:
+        raise GeneticsError(f"multires_grow_fractions needs one fraction per level ({genetics['multires_levels']}), got {genetics['multires_grow_fractions']}")
+    return genetics
+
+
+def compile_plant_genetics(raw_genetics):
+    """
+    Validate the raw plant genetics, compute the derived genetics, and resolve the strategies to their functions.
+
+    Parameters:
+    - raw_genetics: a dict of plant genetics, e.g. as read from the yaml file
+
+    Returns:
+    - a PlantGenetics; raises a GeneticsError for bad genetics
+    """
+    genetics = validate_plant_genetics(raw_genetics)
+    width, height = genetics['width'], genetics['height']
+
+    genetics['dead_colors'] = (genetics['color_rgb_bg'],)
+    genetics['max_particle_inject_inner_radius'] = int(max(width, height) * .8) # inner radius for injection can go most of the way to the edge
+    # NOTE: the inject center is also used by the forest and mask modes as a nominal center for the plant
+    genetics['particle_inject_center'] = (width // 2, height - 1)
+    genetics['seed_mask_points'] = None
+    if genetics['seed_location'] == 'MASK':
+        if genetics['seed_mask_path'] is None:
+            raise GeneticsError("The MASK seed location needs a seed_mask_path")
+        genetics['seed_mask_points'] = tuple(pg.load_seed_mask(genetics['seed_mask_path'], width, height))
+        if not genetics['seed_mask_points']:
+            raise GeneticsError(f"The seed mask {genetics['seed_mask_path']} has no seed points")
+        distance_field = pu.compute_distance_field(genetics['seed_mask_points'], width, height, genetics['mask_movement_max_distance'])
+        if not ((distance_field >= genetics['mask_inject_inner_distance']) & (distance_field <= genetics['mask_inject_outer_distance'])).any():
+            raise GeneticsError(f"The seed mask {genetics['seed_mask_path']} leaves no room to inject particles between mask_inject_inner_distance and mask_inject_outer_distance of it")
+
+    genetics['movement_model'] = pg.setup_movement_model(genetics['movement_strategy'],
+                                                         ((0, 0), (width - 1, height - 1)),
+                                                         genetics['movement_bias_strength'],
+                                                         genetics['movement_wind_direction'],
+                                                         genetics['movement_light_point'],
+                                                         genetics['movement_bias_field'])
+    # biased movement pins particles against the edges of the image unless they are re-injected there
+    genetics['movement_absorb_at_edges'] = genetics['movement_strategy'] != 'FULL_RANDOM_DRIFT'
+
+    if genetics['forest_seed_locations']:
+        genetics['forest_seed_centers'] = genetics['forest_seed_locations']
+    else:
+        genetics['forest_seed_centers'] = tuple(pg.get_forest_seed_layout(genetics['forest_seed_count'], width, height))
+
+    genetics['move_particle'] = pg.MOVE_PARTICLE_FUNCTIONS[genetics['movement_strategy']]
+    genetics['grow_at'] = pg.GROW_AT_FUNCTIONS[genetics['deposit_strategy']]
+    return PlantGenetics(genetics)
+
+
+def read_plant_genetics(genetics_path=PLANT_GENETICS_DEFAULT_PATH):
+    """
+    Read the raw plant genetics from a yaml file, without validating them
+
+    Parameters:
+    - genetics_path: the path of the yaml file holding the plant genetics
+
+    Returns:
+    - a dict of the raw plant genetics
+    """
+    with open(genetics_path, 'r') as stream:
+        return yaml.safe_load(stream)
+
+
+def load_plant_genetics(genetics_path=PLANT_GENETICS_DEFAULT_PATH, **overrides):
+    """
+    Load and compile the plant genetics from a yaml file.
+
+    Parameters:
+    - genetics_path: the path of the yaml file holding the plant genetics
+    - overrides: values that replace those of the file, by key
+
+    Returns:
+    - a PlantGenetics; raises a GeneticsError for bad genetics
+    """
+    return compile_plant_genetics({**read_plant_genetics(genetics_path), **overrides})
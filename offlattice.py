@@ -0,0 +1,259 @@
+from PIL import Image, ImageDraw
+import math
+import random
+import planar_utils as pu
+import plant_growth as pg
+
+##################################
+# Off-lattice growth: particles are discs with float coordinates that take fixed length steps in random directions and
+# stick where they first touch a deposit, so the plant has no axis-aligned lattice artefacts. Deposits are kept in a
+# uniform spatial hash (a dict of cells the size of the contact distance), so a step only checks the few nearby cells.
+# A second, coarse hash lets a particle far from the plant jump: if the 3x3 block of coarse cells around it is empty,
+# no deposit is within a coarse cell of it, and it can move that far in one go (a walk-on-circles step, which has the
+# same hitting statistics as the many small steps it replaces). The plant is only rasterised when it is rendered.
+
+OFFLATTICE_COARSE_CELL_FACTOR = 8
+
+def get_cell(point, cell_size):
+    """
+    Get the spatial hash cell holding a point.
+
+    Parameters:
+    - point: an (x,y) tuple of floats
+    - cell_size: the width and height of a cell
+
+    Returns:
+    - a (column, row) tuple of integers
+    """
+    return (math.floor(point[0] / cell_size), math.floor(point[1] / cell_size))
+
+def setup_deposit_hashes(contact_distance):
+    """
+    Create the (empty) spatial hashes of an off-lattice plant.
+
+    Parameters:
+    - contact_distance: the distance between the centers of two touching discs (i.e. the diameter of a disc)
+
+    Returns:
+    - a dict holding 'cell_size' and 'cells' (a dict mapping a cell to the list of deposits in it), and 'coarse_cell_size' and 'coarse_cells' (the set of coarse cells holding any deposit)
+    """
+    return {'cell_size': contact_distance, 'cells': {},
+            'coarse_cell_size': contact_distance * OFFLATTICE_COARSE_CELL_FACTOR, 'coarse_cells': set()}
+
+def add_deposit(deposit_hashes, deposit):
+    """
+    Add a deposit to the spatial hashes.
+
+    Parameters:
+    - deposit_hashes: the spatial hashes (see setup_deposit_hashes)
+    - deposit: the (x,y) center of the deposited disc
+
+    Returns:
+    - None
+    """
+    deposit_hashes['cells'].setdefault(get_cell(deposit, deposit_hashes['cell_size']), []).append(deposit)
+    deposit_hashes['coarse_cells'].add(get_cell(deposit, deposit_hashes['coarse_cell_size']))
+
+def get_jump_length(deposit_hashes, point):
+    """
+    Get how far a particle can safely move in any direction without touching a deposit, judged by the coarse hash.
+
+    Parameters:
+    - deposit_hashes: the spatial hashes (see setup_deposit_hashes)
+    - point: the (x,y) center of the particle
+
+    Returns:
+    - the safe distance, or 0 if there are deposits near enough that the particle must take small steps
+    """
+    column, row = get_cell(point, deposit_hashes['coarse_cell_size'])
+    coarse_cells = deposit_hashes['coarse_cells']
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            if (column + dx, row + dy) in coarse_cells:
+                return 0
+    return deposit_hashes['coarse_cell_size'] - deposit_hashes['cell_size']
+
+def get_first_contact(deposit_hashes, start, step):
+    """
+    Find where a particle moving along a step first touches a deposit, if it does.
+
+    Parameters:
+    - deposit_hashes: the spatial hashes (see setup_deposit_hashes)
+    - start: the (x,y) center of the particle before the step
+    - step: the (dx,dy) step, no longer than the contact distance
+
+    Returns:
+    - the fraction (0 to 1) of the step taken at first contact, or None if the step touches nothing
+    """
+    contact_distance = deposit_hashes['cell_size']
+    cells = deposit_hashes['cells']
+    (x0, y0), (dx, dy) = start, step
+    min_column, min_row = get_cell((min(x0, x0 + dx) - contact_distance, min(y0, y0 + dy) - contact_distance), contact_distance)
+    max_column, max_row = get_cell((max(x0, x0 + dx) + contact_distance, max(y0, y0 + dy) + contact_distance), contact_distance)
+
+    a = dx * dx + dy * dy
+    first_contact = None
+    for column in range(min_column, max_column + 1):
+        for row in range(min_row, max_row + 1):
+            for cx, cy in cells.get((column, row), ()):
+                # solve |start + t * step - deposit| = contact_distance for the smallest t
+                ox, oy = x0 - cx, y0 - cy
+                c = ox * ox + oy * oy - contact_distance * contact_distance
+                if c <= 0:
+                    return 0.0
+                b = 2 * (dx * ox + dy * oy)
+                discriminant = b * b - 4 * a * c
+                if discriminant < 0:
+                    continue
+                t = (-b - math.sqrt(discriminant)) / (2 * a)
+                if 0 <= t <= 1 and (first_contact is None or t < first_contact):
+                    first_contact = t
+    return first_contact
+
+def is_touching_deposit(deposit_hashes, point):
+    """
+    Determine if a particle touches or overlaps any deposit.
+
+    Parameters:
+    - deposit_hashes: the spatial hashes (see setup_deposit_hashes)
+    - point: the (x,y) center of the particle
+
+    Returns:
+    - True if the particle is within the contact distance of a deposit, False otherwise
+    """
+    contact_distance = deposit_hashes['cell_size']
+    column, row = get_cell(point, contact_distance)
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            for deposit in deposit_hashes['cells'].get((column + dx, row + dy), ()):
+                if pu.distance_between(point, deposit) < contact_distance:
+                    return True
+    return False
+
+def injected_particle_offlattice(deposit_hashes, inject_center, inner_radius, outer_radius, bounds):
+    """
+    Get a particle injected at a random point of a ring, within the bounds and clear of the deposits.
+
+    Parameters:
+    - deposit_hashes: the spatial hashes (see setup_deposit_hashes)
+    - inject_center: the (x,y) center of the injection ring
+    - inner_radius: the inner radius of the injection ring
+    - outer_radius: the outer radius of the injection ring
+    - bounds: a ((min_x, min_y), (max_x, max_y)) tuple of the space the particles move in
+
+    Returns:
+    - an (x,y) tuple of floats
+    """
+    while True:
+        angle = random.uniform(0, 2 * math.pi)
+        r = random.uniform(inner_radius, outer_radius)
+        p = (inject_center[0] + r * math.cos(angle), inject_center[1] + r * math.sin(angle))
+        if pu.is_point_in_rect(p, bounds) and not is_touching_deposit(deposit_hashes, p):
+            return p
+
+def setup_offlattice_seed(deposit_hashes, seed_center, seed_radius):
+    """
+    Set up a round seed of deposits, packed in rows one contact distance apart.
+
+    Parameters:
+    - deposit_hashes: the spatial hashes (see setup_deposit_hashes)
+    - seed_center: the (x,y) center of the seed
+    - seed_radius: the radius of the seed
+
+    Returns:
+    - the list of the seed deposits
+    """
+    contact_distance = deposit_hashes['cell_size']
+    steps = int(seed_radius / contact_distance)
+    seed = [(seed_center[0] + i * contact_distance, seed_center[1] + j * contact_distance)
+            for i in range(-steps, steps + 1) for j in range(-steps, steps + 1)
+            if (i * i + j * j) * contact_distance * contact_distance <= seed_radius * seed_radius]
+    for deposit in seed:
+        add_deposit(deposit_hashes, deposit)
+    return seed
+
+def grow_plant_offlattice(plant_genetics, on_growth=None):
+    """
+    Grow an off-lattice plant from a round seed at the bottom center.
+
+    Parameters:
+    - plant_genetics: the compiled configuration of how the plant grows (see genetics.compile_plant_genetics); the offlattice_* genetics set the size of the discs and the steps
+    - on_growth: an optional function called with the growth count after each growth, e.g. for progress logging
+
+    Returns:
+    - (seed, deposits): the lists of the (x,y) centers of the seed discs and of the grown discs, in the order they grew
+    """
+    deposit_radius = plant_genetics.offlattice_deposit_radius
+    contact_distance = 2 * deposit_radius
+    step_length = min(plant_genetics.offlattice_step_length, contact_distance)
+    bounds = ((0.0, 0.0), (float(plant_genetics.width), float(plant_genetics.height)))
+    seed_center = (plant_genetics.width / 2, plant_genetics.height - deposit_radius)
+
+    deposit_hashes = setup_deposit_hashes(contact_distance)
+    seed = setup_offlattice_seed(deposit_hashes, seed_center, plant_genetics.seed_radius)
+
+    plant_radius = plant_genetics.seed_radius
+    inject_inner_radius, inject_outer_radius, max_movement_radius = pg.get_particle_action_radii_from_base_radius(plant_radius, plant_genetics)
+    particles = [injected_particle_offlattice(deposit_hashes, seed_center, inject_inner_radius, inject_outer_radius, bounds) for _ in range(plant_genetics.particle_count)]
+
+    deposits = []
+    while len(deposits) < plant_genetics.grow_amount:
+        x, y = particles.pop(0)
+        angle = random.uniform(0, 2 * math.pi)
+        jump_length = get_jump_length(deposit_hashes, (x, y))
+        if jump_length > 0:
+            particle = (x + jump_length * math.cos(angle), y + jump_length * math.sin(angle))
+        else:
+            step = (step_length * math.cos(angle), step_length * math.sin(angle))
+            contact = get_first_contact(deposit_hashes, (x, y), step)
+            if contact is not None:
+                deposit = (x + contact * step[0], y + contact * step[1])
+                deposits.append(deposit)
+                add_deposit(deposit_hashes, deposit)
+                if on_growth is not None:
+                    on_growth(len(deposits))
+
+                growth_radius = pu.distance_between(seed_center, deposit)
+                if growth_radius > plant_radius:
+                    plant_radius = growth_radius
+                    inject_inner_radius, inject_outer_radius, max_movement_radius = pg.get_particle_action_radii_from_base_radius(plant_radius, plant_genetics)
+                # NOTE: a waiting particle the new deposit grew over is absorbed, and replaced by a fresh one
+                particles = [p if pu.distance_between(p, deposit) >= contact_distance
+                             else injected_particle_offlattice(deposit_hashes, seed_center, inject_inner_radius, inject_outer_radius, bounds)
+                             for p in particles]
+                particles.append(injected_particle_offlattice(deposit_hashes, seed_center, inject_inner_radius, inject_outer_radius, bounds))
+                continue
+            particle = (x + step[0], y + step[1])
+
+        if not pu.is_point_in_rect(particle, bounds):
+            # a move out of the growth space is refused; clamping instead could push the particle into a deposit
+            particle = (x, y)
+        if pu.distance_between(seed_center, particle) > max_movement_radius:
+            particle = injected_particle_offlattice(deposit_hashes, seed_center, inject_inner_radius, inject_outer_radius, bounds)
+        particles.append(particle)
+
+    return seed, deposits
+
+def render_offlattice(discs, deposit_radius, width, height, scale, bg_color, plant_color):
+    """
+    Rasterise an off-lattice plant at any resolution.
+
+    Parameters:
+    - discs: a list of the (x,y) centers of the discs of the plant
+    - deposit_radius: the radius of a disc
+    - width: the width of the growth space
+    - height: the height of the growth space
+    - scale: how many output pixels per unit of the growth space
+    - bg_color: the (r,g,b,a) background color
+    - plant_color: the (r,g,b) color of the plant
+
+    Returns:
+    - an RGBA image of size (width * scale, height * scale)
+    """
+    image = Image.new('RGBA', (round(width * scale), round(height * scale)), bg_color)
+    draw = ImageDraw.Draw(image)
+    # NOTE: a disc is never drawn smaller than a pixel, so the plant stays connected at low scales
+    r = max(deposit_radius * scale, 0.5)
+    for x, y in discs:
+        draw.ellipse([x * scale - r, y * scale - r, x * scale + r, y * scale + r], fill=plant_color)
+    return image
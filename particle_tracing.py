@@ -0,0 +1,87 @@
+from PIL import Image
+import numpy as np
+
+##################################
+# Particle tracing: how often particles visit each point, kept in a count layer separate from the plant image so that
+# tracing never changes how the plant grows. Visits are buffered and added to the layer in bulk.
+
+VISIT_BUFFER_SIZE = 4096
+HEATMAP_DEFAULT_OPACITY = 0.8
+
+def setup_visit_counts(width, height):
+    """
+    Create an empty visit count layer.
+
+    Parameters:
+    - width: the width of the plant image
+    - height: the height of the plant image
+
+    Returns:
+    - a (height, width) integer numpy array of zeros, indexed [y, x]
+    """
+    return np.zeros((height, width), dtype=np.int64)
+
+def record_visit(visit_counts, visit_buffer, point):
+    """
+    Record a visit of a particle to a point; visits are buffered, and added to the visit counts once the buffer is full.
+
+    Parameters:
+    - visit_counts: the visit count layer (see setup_visit_counts)
+    - visit_buffer: a list of the (x,y) points visited since the buffer was last flushed; updated in place
+    - point: the (x,y) point visited
+
+    Returns:
+    - None
+    """
+    visit_buffer.append(point)
+    if len(visit_buffer) >= VISIT_BUFFER_SIZE:
+        flush_visit_buffer(visit_counts, visit_buffer)
+
+def flush_visit_buffer(visit_counts, visit_buffer):
+    """
+    Add the buffered visits to the visit counts, and empty the buffer.
+
+    Parameters:
+    - visit_counts: the visit count layer (see setup_visit_counts)
+    - visit_buffer: a list of visited (x,y) points; emptied in place
+
+    Returns:
+    - None
+    """
+    if visit_buffer:
+        xs, ys = np.array(visit_buffer).T
+        np.add.at(visit_counts, (ys, xs), 1)
+        visit_buffer.clear()
+
+def get_heatmap_colors(visit_counts):
+    """
+    Get the colors of a log-scaled heatmap of the visit counts; black (no visits) through red and yellow to white (the most visits).
+
+    Parameters:
+    - visit_counts: the visit count layer (see setup_visit_counts)
+
+    Returns:
+    - a (height, width, 3) uint8 numpy array of colors
+    """
+    scaled = np.log1p(visit_counts)
+    if scaled.max() > 0:
+        scaled /= scaled.max()
+    heat = np.stack([np.clip(3 * scaled, 0, 1), np.clip(3 * scaled - 1, 0, 1), np.clip(3 * scaled - 2, 0, 1)], axis=2)
+    return np.rint(heat * 255).astype(np.uint8)
+
+def render_visit_heatmap(image, visit_counts, opacity=HEATMAP_DEFAULT_OPACITY):
+    """
+    Render the visit counts as a log-scaled heatmap over the plant image; points never visited show the plant image as is.
+
+    Parameters:
+    - image: the plant image
+    - visit_counts: the visit count layer (see setup_visit_counts), the same size as the image
+    - opacity: how opaque the heatmap is over the plant image, from 0 to 1
+
+    Returns:
+    - a new RGB image
+    """
+    base = np.asarray(image.convert('RGB'), dtype=np.float32)
+    alpha = (visit_counts > 0)[:, :, np.newaxis] * opacity
+    overlay = base * (1 - alpha) + get_heatmap_colors(visit_counts) * alpha
+    return Image.fromarray(np.rint(overlay).astype(np.uint8), 'RGB')
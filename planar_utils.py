@@ -1,5 +1,6 @@
 import random
 import math
+import numpy as np
 
 def distance_between(p1,p2):
     """
@@ -165,6 +166,21 @@ def is_point_in_rect(point, box):
     else:
         return False
 
+def is_point_on_rect_edge(point, box):
+    """
+    Check if the given point is on the edge of the given rectangle.
+
+    Parameters:
+    - point: an (x,y) tuple, using an image orientation of the plane (i.e. upper left is 0,0
+    - box: a tuple of (upper left point, lower right point) representing the bounding box.
+
+    Returns:
+    - True if the point is on the edge of the rectangle, False otherwise (including when it is outside the rectangle)
+    """
+    (x, y) = point
+    (x_min, y_min), (x_max, y_max) = box
+    return is_point_in_rect(point, box) and (x in (x_min, x_max) or y in (y_min, y_max))
+
 def get_random_point_in_rect(box):
     """
     Get a random point within the given rectangle.
@@ -199,4 +215,65 @@ def filter_points_within_bounding_box(coordinates, box):
         (x, y) for x, y in coordinates
         if min_x <= x <= max_x and min_y <= y <= max_y
     ]
-    return filtered_coordinates
\ No newline at end of file
+    return filtered_coordinates
+
+def compute_distance_field(points, width, height, max_distance):
+    """
+    Compute the distance from every point of a grid to the nearest of the given points, where distance is the number of 8-adjacent steps (i.e. the chessboard distance). Distances beyond max_distance are not tracked, and are all reported as max_distance + 1.
+
+    Parameters:
+    - points: the (x,y) tuples to measure distances from; points outside the grid are ignored
+    - width: the width of the grid
+    - height: the height of the grid
+    - max_distance: the largest distance to track
+
+    Returns:
+    - the distance field, as a (width, height) numpy array so that it is indexed field[x, y] (like the pixels of an image)
+    """
+    field = np.full((width, height), max_distance + 1, dtype=np.min_scalar_type(max_distance + 1))
+    xys = np.array(points, dtype=np.int64).reshape(-1, 2)
+    xys = xys[(xys[:, 0] >= 0) & (xys[:, 0] < width) & (xys[:, 1] >= 0) & (xys[:, 1] < height)]
+    if not len(xys):
+        return field
+
+    # NOTE: only the bounding box of the points, grown by max_distance, can be within max_distance of them
+    min_x, min_y = np.maximum(xys.min(axis=0) - max_distance, 0)
+    max_x, max_y = np.minimum(xys.max(axis=0) + max_distance, (width - 1, height - 1))
+    window = field[min_x:max_x + 1, min_y:max_y + 1]
+    reached = np.zeros(window.shape, dtype=bool)
+    reached[xys[:, 0] - min_x, xys[:, 1] - min_y] = True
+    window[reached] = 0
+    # each 8-adjacent step grows the reached area by one point in every direction (a 3x3 dilation, done as a row pass and a column pass)
+    for distance in range(1, max_distance + 1):
+        grown = reached.copy()
+        grown[1:, :] |= reached[:-1, :]
+        grown[:-1, :] |= reached[1:, :]
+        spread = grown.copy()
+        spread[:, 1:] |= grown[:, :-1]
+        spread[:, :-1] |= grown[:, 1:]
+        window[spread & ~reached] = distance
+        reached = spread
+    return field
+
+def update_distance_field(field, point, max_distance):
+    """
+    Update a distance field in place for a new point; only the neighborhood within max_distance of the new point is touched, so the cost follows the size of that neighborhood rather than the size of the grid.
+
+    Parameters:
+    - field: a distance field as made by compute_distance_field, indexed field[x, y]
+    - point: the new (x,y) point to measure distances from
+    - max_distance: the largest distance to track (the same as used to compute the field)
+
+    Returns:
+    - None
+    """
+    width, height = field.shape
+    x, y = point
+    if not (0 <= x < width and 0 <= y < height) or field[x, y] == 0:
+        return
+    min_x, max_x = max(x - max_distance, 0), min(x + max_distance, width - 1)
+    min_y, max_y = max(y - max_distance, 0), min(y + max_distance, height - 1)
+    # the distance to the new point is the chessboard distance; the field keeps whichever distance is closer
+    distances = np.maximum(np.abs(np.arange(min_x, max_x + 1) - x)[:, np.newaxis], np.abs(np.arange(min_y, max_y + 1) - y)[np.newaxis, :])
+    window = field[min_x:max_x + 1, min_y:max_y + 1]
+    np.minimum(window, distances.astype(field.dtype), out=window)
@@ -1,6 +1,26 @@
-from PIL import ImageDraw
+from PIL import Image, ImageDraw
+from collections import namedtuple
 import planar_utils as pu
+import numpy as np
 import random
+import math
+
+# the (dx,dy) moves to the 8 adjacent points, in the same order as pu.get_adjacent_points
+ADJACENT_OFFSETS = pu.get_adjacent_points((0, 0))
+
+# the number of direction buckets (each with its own move table) used for PHOTOTROPISM
+PHOTOTROPISM_DIRECTION_BUCKETS = 16
+
+# how many candidate points an injection may reject before giving up, rather than looping forever when no candidate can ever be kept
+INJECTION_MAX_ATTEMPTS = 100000
+
+# precompiled move tables of a biased movement strategy; one alias table per bucket (a direction or a region of the image)
+# - tables: a list of (prob, alias) alias tables as python lists, for moving a single particle
+# - np_prob, np_alias: the same tables as (bucket count, 8) arrays, for moving a batch of particles
+# - light_point: the (x,y) light point for PHOTOTROPISM, else None
+# - field_cell_size: the (width, height) of a cell of the bias field for BIAS_FIELD, else None
+# - field_shape: the (column count, row count) of the bias field for BIAS_FIELD, else None
+MovementModel = namedtuple('MovementModel', ['strategy', 'tables', 'np_prob', 'np_alias', 'light_point', 'field_cell_size', 'field_shape'])
 
 def injected_particle_ring(inject_center, inner_radius, outer_radius, image_bounds):
     """
@@ -62,7 +82,46 @@ def is_adjacent_to_live_pixel(point, pixels, dead_colors, bounding_box):
             continue
     return False
 
-def move_particle(point, bounding_box, strategy = 'FULL_RANDOM_DRIFT'):
+def move_particle_random(point, bounding_box, movement_model=None):
+    """
+    get a moved version of the given point: drift it to a randomly chosen adjacent (8-box) one
+
+    Parameters:
+    - point: an (x,y) tuple, using an image orientation of the plane (i.e. upper left is 0,0)
+    - bounding_box: Tuple of ((min_x, min_y), (max_x, max_y)) reprenting the limits of movement
+    - movement_model: not used; for the same signature as move_particle_biased
+
+    Returns:
+    - the moved point
+    """
+    return pu.constrain_point_to_bounding_box(random.choice(pu.get_adjacent_points(point)), bounding_box)
+
+def move_particle_biased(point, bounding_box, movement_model):
+    """
+    get a moved version of the given point: drift it to an adjacent (8-box) one, chosen according to the move tables of the movement model
+
+    Parameters:
+    - point: an (x,y) tuple, using an image orientation of the plane (i.e. upper left is 0,0)
+    - bounding_box: Tuple of ((min_x, min_y), (max_x, max_y)) reprenting the limits of movement
+    - movement_model: the MovementModel of a biased strategy (see setup_movement_model)
+
+    Returns:
+    - the moved point
+    """
+    prob, alias = movement_model.tables[get_movement_bucket(movement_model, point)]
+    dx, dy = ADJACENT_OFFSETS[sample_alias_table(prob, alias)]
+    return pu.constrain_point_to_bounding_box((point[0] + dx, point[1] + dy), bounding_box)
+
+# the function that carries out each movement strategy; the plant genetics resolve the strategy to its function once (see genetics.compile_plant_genetics)
+MOVE_PARTICLE_FUNCTIONS = {
+    'FULL_RANDOM_DRIFT': move_particle_random,
+    'GRAVITY': move_particle_biased,
+    'WIND': move_particle_biased,
+    'PHOTOTROPISM': move_particle_biased,
+    'BIAS_FIELD': move_particle_biased,
+}
+
+def move_particle(point, bounding_box, strategy = 'FULL_RANDOM_DRIFT', movement_model = None):
     """
     get a moved version of the given point according to the given strategy.
 
@@ -71,16 +130,54 @@ def move_particle(point, bounding_box, strategy = 'FULL_RANDOM_DRIFT'):
     - bounding_box: Tuple of ((min_x, min_y), (max_x, max_y)) reprenting the limits of movement
     - strategy: the drift strategy to use. Options are:
     - 'FULL_RANDOM_DRIFT': drift the point to a randomly chosen adjacent (8-box) one
+    - 'GRAVITY', 'WIND', 'PHOTOTROPISM', 'BIAS_FIELD': drift the point to an adjacent (8-box) one, chosen according to the move tables of the movement_model
+    - movement_model: the MovementModel for the biased strategies (see setup_movement_model)
 
     Returns:
     - a point that has been moved according to the given strategy
     """
-    if strategy == 'FULL_RANDOM_DRIFT':
-        adjacent_points = pu.get_adjacent_points(point)
-        # Choose one of the adjacent points at random
-        point = random.choice(adjacent_points)
-        
-    return pu.constrain_point_to_bounding_box(point,bounding_box)
+    return MOVE_PARTICLE_FUNCTIONS[strategy](point, bounding_box, movement_model)
+
+def move_particles_batch(xs, ys, bounding_box, movement_model, rng):
+    """
+    Move a batch of particles at once, each to an adjacent (8-box) point chosen according to the move tables of the movement model.
+
+    Parameters:
+    - xs: an integer numpy array of the x coordinates of the particles
+    - ys: an integer numpy array of the y coordinates of the particles
+    - bounding_box: Tuple of ((min_x, min_y), (max_x, max_y)) reprenting the limits of movement
+    - movement_model: the MovementModel to move by (see setup_movement_model); any strategy, including FULL_RANDOM_DRIFT
+    - rng: a numpy random Generator
+
+    Returns:
+    - (xs, ys), new numpy arrays of the moved coordinates
+    """
+    buckets = get_movement_buckets(movement_model, xs, ys)
+    columns = rng.integers(0, len(ADJACENT_OFFSETS), size=len(xs))
+    keep = rng.random(len(xs)) < movement_model.np_prob[buckets, columns]
+    moves = np.where(keep, columns, movement_model.np_alias[buckets, columns])
+    offsets = np.array(ADJACENT_OFFSETS)
+    (min_x, min_y), (max_x, max_y) = bounding_box
+    return np.clip(xs + offsets[moves, 0], min_x, max_x), np.clip(ys + offsets[moves, 1], min_y, max_y)
+
+def deposit_at(point, pixels, plant_color):
+    """
+    convert a single pixel at the given point into part of the plant
+
+    Parameters:
+    - point: an (x,y) tuple, using an image orientation of the plane (i.e. upper left is 0,0)
+    - pixels: a grid of pixel values, using an image orientation of the plane (i.e. upper left is 0,0)
+    - plant_color: the color of the plant
+
+    Returns:
+    - None
+    """
+    pixels[point[0],point[1]] = plant_color
+
+# the function that carries out each growth (deposit) strategy; resolved once by the plant genetics, as for MOVE_PARTICLE_FUNCTIONS
+GROW_AT_FUNCTIONS = {
+    'DEPOSIT': deposit_at,
+}
 
 def grow_at(point, pixels, plant_color, strategy = 'DEPOSIT'):
     """
@@ -95,8 +192,7 @@ def grow_at(point, pixels, plant_color, strategy = 'DEPOSIT'):
     Returns:
     - None
     """
-    if strategy == 'DEPOSIT':
-        pixels[point[0],point[1]] = plant_color
+    GROW_AT_FUNCTIONS[strategy](point, pixels, plant_color)
 
 def setup_plant_seed_bottom_center(image, seed_radius, fill_color):
     """
@@ -134,13 +230,13 @@ def get_particle_action_radii_from_base_radius(base_radius, plant_genetics):
     Returns:
     - a list of particle radii: inject_inner_radius, inject_outer_radius, and max_movement_radius
     """
-    particle_inject_inner_radius = min(plant_genetics['max_particle_inject_inner_radius'], base_radius * plant_genetics['particle_injection_min_radius_factor'])
-    particle_inject_outer_radius = base_radius * plant_genetics['particle_injection_max_radius_factor']
-    particle_max_movement_radius = particle_inject_outer_radius + plant_genetics['particle_movement_max_radius_extension']
+    particle_inject_inner_radius = min(plant_genetics.max_particle_inject_inner_radius, base_radius * plant_genetics.particle_injection_min_radius_factor)
+    particle_inject_outer_radius = base_radius * plant_genetics.particle_injection_max_radius_factor
+    particle_max_movement_radius = particle_inject_outer_radius + plant_genetics.particle_movement_max_radius_extension
     return particle_inject_inner_radius, particle_inject_outer_radius, particle_max_movement_radius
 
 
-def get_particle_within_movement_bounds_ring(orig_particle, inject_center, inject_inner_radius, inject_outer_radius, max_movement_radius, bounding_box):
+def get_particle_within_movement_bounds_ring(orig_particle, inject_center, inject_inner_radius, inject_outer_radius, max_movement_radius, bounding_box, absorb_at_edges=False):
     """
     Determine if the given particle is within the movement bounds of the given particle based on the inject center and max movement radius. If so, return it, and if not return a newly injected particle.
 
@@ -151,12 +247,13 @@ def get_particle_within_movement_bounds_ring(orig_particle, inject_center, injec
     - particle_inject_outer_radius: the outer radius of the particle injection ring
     - particle_max_movement_radius: the maximum movement radius of the particle from the inject center
     - bounding_box: the bounding box of the grid that contains the particle, a tuple of ((min_x, min_y), (max_x, max_y))
+    - absorb_at_edges: if True, a particle at the edge of the bounding box is also out of bounds (for biased movement, which would otherwise pin particles against the edge)
 
     Returns:
     - a particle object that is within the movement bounds; either the original particle, or a new or a newly injected particle
     """
     particle_distance = pu.distance_between(inject_center,orig_particle)
-    if particle_distance > max_movement_radius:
+    if particle_distance > max_movement_radius or (absorb_at_edges and pu.is_point_on_rect_edge(orig_particle, bounding_box)):
         return injected_particle_ring(inject_center, inject_inner_radius, inject_outer_radius, bounding_box)
     return orig_particle
 
@@ -176,7 +273,7 @@ def grow_radii(particle_that_grew, plant_radius, plant_genetics):
     - particle_inject_outer_radius
     - particle_max_movement_radius
     """
-    growth_radius = pu.distance_between(plant_genetics['particle_inject_center'], particle_that_grew)
+    growth_radius = pu.distance_between(plant_genetics.particle_inject_center, particle_that_grew)
     if growth_radius > plant_radius:
         plant_radius = growth_radius
         particle_inject_inner_radius, particle_inject_outer_radius, particle_max_movement_radius = get_particle_action_radii_from_base_radius(
@@ -184,4 +281,438 @@ def grow_radii(particle_that_grew, plant_radius, plant_genetics):
             plant_genetics
             )
         return plant_radius, particle_inject_inner_radius, particle_inject_outer_radius, particle_max_movement_radius
-    return None
\ No newline at end of file
+    return None
+
+##################################
+# FOREST - several plants grown together on one canvas, sharing the walker pool and the occupancy of the image
+
+def get_forest_seed_layout(seed_count, width, height):
+    """
+    Get evenly spaced seed locations along the bottom of the image, for growing a forest.
+
+    Parameters:
+    - seed_count: the number of seeds to place
+    - width: the width of the image
+    - height: the height of the image
+
+    Returns:
+    - a list of (x,y) tuples, one per seed, from left to right
+    """
+    return [((i + 1) * width // (seed_count + 1), height - 1) for i in range(seed_count)]
+
+
+def setup_plant_seeds(pixels, seed_centers, seed_radius, fill_colors, ownership, bounding_box):
+    """
+    Set up several plant seeds, recording which plant owns each seed point.
+
+    Parameters:
+    - pixels: a grid of pixel values, using an image orientation of the plane (i.e. upper left is 0,0)
+    - seed_centers: a list of (x,y) tuples, the center of each seed
+    - seed_radius: the radius of each plant seed
+    - fill_colors: a list of colors, the color to fill each seed with (parallel to seed_centers)
+    - ownership: a dict mapping (x,y) points to the index of the plant that owns them; updated in place
+    - bounding_box: Tuple of ((min_x, min_y), (max_x, max_y)) representing the bounds of the pixels
+
+    Returns:
+    - None
+    """
+    for plant_index, (seedx, seedy) in enumerate(seed_centers):
+        for dx in range(-seed_radius, seed_radius + 1):
+            for dy in range(-seed_radius, seed_radius + 1):
+                point = (seedx + dx, seedy + dy)
+                if dx * dx + dy * dy <= seed_radius * seed_radius and pu.is_point_in_rect(point, bounding_box):
+                    pixels[point] = fill_colors[plant_index]
+                    ownership[point] = plant_index
+
+
+def get_adjacent_owner(point, ownership):
+    """
+    Get the plant that owns a point adjacent to the given point.
+
+    Parameters:
+    - point: an (x,y) tuple, using an image orientation of the plane (i.e. upper left is 0,0)
+    - ownership: a dict mapping (x,y) points to the index of the plant that owns them
+
+    Returns:
+    - the index of the plant owning an adjacent point, or None if no adjacent point is owned
+    """
+    for adj_point in pu.get_adjacent_points(point):
+        owner = ownership.get(adj_point)
+        if owner is not None:
+            return owner
+    return None
+
+
+def count_rings_covering_point(point, plant_extents):
+    """
+    Count the injection rings of the forest that cover the given point.
+
+    Parameters:
+    - point: an (x,y) tuple
+    - plant_extents: a list of (center, inject_inner_radius, inject_outer_radius, max_movement_radius) tuples, one per plant
+
+    Returns:
+    - the number of plants whose injection ring holds the point
+    """
+    return sum(1 for center, inner_radius, outer_radius, _ in plant_extents
+               if inner_radius <= pu.distance_between(center, point) <= outer_radius)
+
+
+def injected_particle_forest(plant_extents, bounding_box):
+    """
+    Get a particle injected uniformly into the union of the injection rings of all the plants of a forest.
+    A plant is picked in proportion to the area of its ring, and a point in overlapping rings is kept only in proportion to the number of rings holding it, so crowded areas aren't over-seeded.
+
+    Parameters:
+    - plant_extents: a list of (center, inject_inner_radius, inject_outer_radius, max_movement_radius) tuples, one per plant
+    - bounding_box: Tuple of ((min_x, min_y), (max_x, max_y)) representing the bounding box of the injection area (usually the image bounds)
+
+    Returns:
+    - an (x,y) tuple representing the injected particle, where x and y are integers; raises a ValueError if no point of the rings is found within the bounding box after INJECTION_MAX_ATTEMPTS tries
+    """
+    ring_areas = [outer_radius ** 2 - inner_radius ** 2 for _, inner_radius, outer_radius, _ in plant_extents]
+    for _ in range(INJECTION_MAX_ATTEMPTS):
+        center, inner_radius, outer_radius, _ = random.choices(plant_extents, weights=ring_areas)[0]
+        p = pu.get_random_point_in_ring(center, inner_radius, outer_radius)
+        if not pu.is_point_in_rect(p, bounding_box):
+            continue
+        if random.random() * max(1, count_rings_covering_point(p, plant_extents)) < 1:
+            return p
+    raise ValueError(f"No injection point for the forest was found within {bounding_box} in {INJECTION_MAX_ATTEMPTS} tries; are the seeds within the image?")
+
+
+def get_particle_within_movement_bounds_forest(orig_particle, plant_extents, bounding_box, absorb_at_edges=False):
+    """
+    Determine if the given particle is within the movement bounds of any plant of a forest. If so, return it, and if not return a newly injected particle.
+
+    Parameters:
+    - orig_particle: an (x,y) tuple where x and y are integer cooridinates on a grid with 0,0 in the upper left
+    - plant_extents: a list of (center, inject_inner_radius, inject_outer_radius, max_movement_radius) tuples, one per plant
+    - bounding_box: the bounding box of the grid that contains the particle, a tuple of ((min_x, min_y), (max_x, max_y))
+    - absorb_at_edges: if True, a particle at the edge of the bounding box is also out of bounds (for biased movement, which would otherwise pin particles against the edge)
+
+    Returns:
+    - a particle that is within the movement bounds; either the original particle, or a newly injected particle
+    """
+    if absorb_at_edges and pu.is_point_on_rect_edge(orig_particle, bounding_box):
+        return injected_particle_forest(plant_extents, bounding_box)
+    for center, _, _, max_movement_radius in plant_extents:
+        if pu.distance_between(center, orig_particle) <= max_movement_radius:
+            return orig_particle
+    return injected_particle_forest(plant_extents, bounding_box)
+
+
+
+##################################
+# SEED MASK - a plant grown from an arbitrary seed shape, with particles injected at a bounded distance from some part of the plant
+
+def load_seed_mask(mask_path, width, height, threshold=128):
+    """
+    Load the points of a seed shape from a mask image; the mask is scaled to the size of the plant image if needed.
+
+    Parameters:
+    - mask_path: the path of the mask image; light pixels are part of the seed, dark ones are not
+    - width: the width of the plant image
+    - height: the height of the plant image
+    - threshold: the lowest brightness (0-255) of a pixel that is part of the seed
+
+    Returns:
+    - a list of (x,y) tuples, the points of the seed
+    """
+    mask = Image.open(mask_path).convert('L')
+    if mask.size != (width, height):
+        mask = mask.resize((width, height), Image.NEAREST)
+    mask_pixels = mask.load()
+    return [(x, y) for x in range(width) for y in range(height) if mask_pixels[x, y] >= threshold]
+
+
+def setup_plant_seed_mask(pixels, seed_points, fill_color):
+    """
+    Set up a plant seed of an arbitrary shape.
+
+    Parameters:
+    - pixels: a grid of pixel values, using an image orientation of the plane (i.e. upper left is 0,0)
+    - seed_points: a list of (x,y) tuples, the points of the seed
+    - fill_color: the color to fill the plant seed with
+
+    Returns:
+    - None
+    """
+    for point in seed_points:
+        pixels[point] = fill_color
+
+
+def get_plant_points(image, dead_colors):
+    """
+    Get all the points of an image that are part of a plant, i.e. that have a color not in the dead_colors list.
+
+    Parameters:
+    - image: the plant image
+    - dead_colors: the (r,g,b) colors that are not part of the plant
+
+    Returns:
+    - a list of (x,y) tuples, the points of the plant, column by column
+    """
+    colors = np.asarray(image.convert('RGB'))
+    is_plant = np.ones(colors.shape[:2], dtype=bool)
+    for dead_color in dead_colors:
+        is_plant &= (colors != dead_color).any(axis=2)
+    # NOTE: the mask is indexed [y, x], so it's transposed to get (x,y) points in column order
+    return list(map(tuple, np.argwhere(is_plant.T).tolist()))
+
+
+def get_plant_radius(plant_points, plant_center):
+    """
+    Get the radius of a plant, i.e. the distance from its center to its furthest point.
+
+    Parameters:
+    - plant_points: a list of the (x,y) points of the plant
+    - plant_center: the (x,y) center of the plant
+
+    Returns:
+    - the radius of the plant, or 0 for a plant with no points
+    """
+    if not plant_points:
+        return 0
+    offsets = np.array(plant_points) - plant_center
+    return float(np.hypot(offsets[:, 0], offsets[:, 1]).max())
+
+
+def setup_distance_band(distance_field, inner_distance, outer_distance):
+    """
+    Set up the injection band of a distance field: the points whose distance from the plant is within the given band, kept so that one can be picked at random in constant time.
+
+    Parameters:
+    - distance_field: the distance from each point of the grid to the plant, indexed distance_field[x, y] (see pu.compute_distance_field)
+    - inner_distance: the smallest distance from the plant at which to inject
+    - outer_distance: the largest distance from the plant at which to inject
+
+    Returns:
+    - a dict holding the band distances, 'in_band' (a boolean array like the distance field), 'cells' (a list of the (x,y) points of the band), and 'cell_indexes' (a dict mapping each point of the band to its index in cells)
+    """
+    in_band = (distance_field >= inner_distance) & (distance_field <= outer_distance)
+    cells = list(map(tuple, np.argwhere(in_band).tolist()))
+    return {'inner_distance': inner_distance, 'outer_distance': outer_distance, 'in_band': in_band,
+            'cells': cells, 'cell_indexes': {cell: i for i, cell in enumerate(cells)}}
+
+
+def update_distance_band(distance_band, distance_field, point, max_distance):
+    """
+    Update the injection band for a new point of the plant, after the distance field has been updated for it (see pu.update_distance_field); only the distances within max_distance of the point can have changed.
+
+    Parameters:
+    - distance_band: the injection band (see setup_distance_band); updated in place
+    - distance_field: the updated distance field, indexed distance_field[x, y]
+    - point: the new (x,y) point of the plant
+    - max_distance: the largest distance the field tracks
+
+    Returns:
+    - None
+    """
+    width, height = distance_field.shape
+    min_x, max_x = max(point[0] - max_distance, 0), min(point[0] + max_distance, width - 1)
+    min_y, max_y = max(point[1] - max_distance, 0), min(point[1] + max_distance, height - 1)
+    field_window = distance_field[min_x:max_x + 1, min_y:max_y + 1]
+    in_band_window = distance_band['in_band'][min_x:max_x + 1, min_y:max_y + 1]
+    now_in_band = (field_window >= distance_band['inner_distance']) & (field_window <= distance_band['outer_distance'])
+
+    cells, cell_indexes = distance_band['cells'], distance_band['cell_indexes']
+    for dx, dy in np.argwhere(now_in_band != in_band_window).tolist():
+        cell = (min_x + dx, min_y + dy)
+        if now_in_band[dx, dy]:
+            cell_indexes[cell] = len(cells)
+            cells.append(cell)
+        else:
+            # NOTE: the last cell fills the gap, so a removal doesn't shift the rest of the list
+            index = cell_indexes.pop(cell)
+            last_cell = cells.pop()
+            if last_cell != cell:
+                cells[index] = last_cell
+                cell_indexes[last_cell] = index
+    in_band_window[...] = now_in_band
+
+
+def injected_particle_distance_band(distance_band):
+    """
+    Get a particle injected at a point picked at random from the injection band, so particles start near the plant whatever its shape.
+
+    Parameters:
+    - distance_band: the injection band (see setup_distance_band)
+
+    Returns:
+    - an (x,y) tuple representing the injected particle, where x and y are integers; raises a ValueError if the band is empty (e.g. the plant has filled the image)
+    """
+    if not distance_band['cells']:
+        raise ValueError(f"No point is between {distance_band['inner_distance']} and {distance_band['outer_distance']} steps from the plant to inject a particle at")
+    return random.choice(distance_band['cells'])
+
+
+def get_particle_within_movement_bounds_distance(orig_particle, distance_field, distance_band, max_movement_distance, bounding_box, absorb_at_edges=False):
+    """
+    Determine if the given particle is within max_movement_distance of the plant (per the distance field). If so, return it, and if not return a newly injected particle.
+
+    Parameters:
+    - orig_particle: an (x,y) tuple where x and y are integer cooridinates on a grid with 0,0 in the upper left
+    - distance_field: the distance from each point of the grid to the plant, indexed distance_field[x, y]
+    - distance_band: the injection band (see setup_distance_band)
+    - max_movement_distance: the largest distance from the plant a particle may wander
+    - bounding_box: the bounding box of the grid that contains the particle, a tuple of ((min_x, min_y), (max_x, max_y))
+    - absorb_at_edges: if True, a particle at the edge of the bounding box is also out of bounds (for biased movement, which would otherwise pin particles against the edge)
+
+    Returns:
+    - a particle that is within the movement bounds; either the original particle, or a newly injected particle
+    """
+    if distance_field[orig_particle] > max_movement_distance or (absorb_at_edges and pu.is_point_on_rect_edge(orig_particle, bounding_box)):
+        return injected_particle_distance_band(distance_band)
+    return orig_particle
+
+
+
+##################################
+# BIASED MOVEMENT - the probabilities of each move are precompiled into alias tables, so that a biased move costs the same as an unbiased one
+
+def build_alias_table(weights):
+    """
+    Build an alias table (Vose's method) for sampling indexes in proportion to the given weights in constant time.
+
+    Parameters:
+    - weights: a list of non-negative weights, not all zero
+
+    Returns:
+    - (prob, alias): two lists the length of weights; see sample_alias_table
+    """
+    n = len(weights)
+    total = sum(weights)
+    scaled = [w * n / total for w in weights]
+    prob, alias = [1.0] * n, list(range(n))
+    small = [i for i, w in enumerate(scaled) if w < 1]
+    large = [i for i, w in enumerate(scaled) if w >= 1]
+    while small and large:
+        s, l = small.pop(), large.pop()
+        prob[s], alias[s] = scaled[s], l
+        scaled[l] -= 1 - scaled[s]
+        (small if scaled[l] < 1 else large).append(l)
+    # anything left over is (up to rounding) exactly 1
+    return prob, alias
+
+
+def sample_alias_table(prob, alias):
+    """
+    Sample an index from an alias table.
+
+    Parameters:
+    - prob, alias: an alias table as built by build_alias_table
+
+    Returns:
+    - an index, chosen in proportion to the weights the table was built from
+    """
+    i = random.randrange(len(prob))
+    return i if random.random() < prob[i] else alias[i]
+
+
+def get_bias_move_weights(bias_direction, bias_strength):
+    """
+    Get the weight of each adjacent move for a walk that is biased toward the given direction.
+
+    Parameters:
+    - bias_direction: a (dx,dy) vector in the direction of the bias, using an image orientation of the plane (i.e. +y is down); its length doesn't matter; (0,0) is no bias
+    - bias_strength: how strong the bias is; 0 is no bias
+
+    Returns:
+    - a list of weights, one for each of ADJACENT_OFFSETS
+    """
+    bias_length = math.hypot(*bias_direction)
+    if bias_length == 0:
+        return [1.0] * len(ADJACENT_OFFSETS)
+    bx, by = bias_direction[0] / bias_length, bias_direction[1] / bias_length
+    return [math.exp(bias_strength * (dx * bx + dy * by) / math.hypot(dx, dy)) for dx, dy in ADJACENT_OFFSETS]
+
+
+def setup_movement_model(strategy, bounding_box, bias_strength=0, wind_direction=(0, 0), light_point=(0, 0), bias_field=None):
+    """
+    Precompile the move tables of a movement strategy.
+
+    Parameters:
+    - strategy: the movement strategy. Options are:
+    - 'FULL_RANDOM_DRIFT': no bias
+    - 'GRAVITY': particles drift down (toward +y)
+    - 'WIND': particles drift in the wind_direction
+    - 'PHOTOTROPISM': particles stream away from the light_point, so the plant grows toward the light
+    - 'BIAS_FIELD': particles drift per the bias_field, which varies across the image
+    - bounding_box: Tuple of ((min_x, min_y), (max_x, max_y)) of the image the particles move in
+    - bias_strength: how strong the bias is; 0 is no bias
+    - wind_direction: a (dx,dy) vector, the direction of the wind for 'WIND'
+    - light_point: an (x,y) point, the location of the light for 'PHOTOTROPISM'
+    - bias_field: for 'BIAS_FIELD', a grid (a list of rows) of (dx,dy) bias directions, stretched over the image
+
+    Returns:
+    - a MovementModel
+    """
+    light = field_cell_size = field_shape = None
+    if strategy == 'FULL_RANDOM_DRIFT':
+        directions = [(0, 0)]
+    elif strategy == 'GRAVITY':
+        directions = [(0, 1)]
+    elif strategy == 'WIND':
+        directions = [tuple(wind_direction)]
+    elif strategy == 'PHOTOTROPISM':
+        light = tuple(light_point)
+        directions = [(math.cos(2 * math.pi * b / PHOTOTROPISM_DIRECTION_BUCKETS), math.sin(2 * math.pi * b / PHOTOTROPISM_DIRECTION_BUCKETS))
+                      for b in range(PHOTOTROPISM_DIRECTION_BUCKETS)]
+    elif strategy == 'BIAS_FIELD':
+        (min_x, min_y), (max_x, max_y) = bounding_box
+        field_shape = (len(bias_field[0]), len(bias_field))
+        field_cell_size = ((max_x - min_x + 1) / field_shape[0], (max_y - min_y + 1) / field_shape[1])
+        directions = [tuple(direction) for row in bias_field for direction in row]
+    else:
+        raise ValueError(f"Unknown movement strategy {strategy}")
+
+    tables = [build_alias_table(get_bias_move_weights(direction, bias_strength)) for direction in directions]
+    np_prob = np.array([prob for prob, _ in tables])
+    np_alias = np.array([alias for _, alias in tables])
+    return MovementModel(strategy, tables, np_prob, np_alias, light, field_cell_size, field_shape)
+
+
+def get_movement_bucket(movement_model, point):
+    """
+    Get the index of the move table to use for a particle at the given point.
+
+    Parameters:
+    - movement_model: a MovementModel
+    - point: an (x,y) tuple
+
+    Returns:
+    - the index of the move table in movement_model.tables
+    """
+    if movement_model.light_point is not None:
+        angle = pu.angle_between(movement_model.light_point, point)
+        return round(angle * PHOTOTROPISM_DIRECTION_BUCKETS / (2 * math.pi)) % PHOTOTROPISM_DIRECTION_BUCKETS
+    if movement_model.field_shape is not None:
+        columns, rows = movement_model.field_shape
+        column = min(columns - 1, max(0, int(point[0] / movement_model.field_cell_size[0])))
+        row = min(rows - 1, max(0, int(point[1] / movement_model.field_cell_size[1])))
+        return row * columns + column
+    return 0
+
+
+def get_movement_buckets(movement_model, xs, ys):
+    """
+    Get the index of the move table to use for each of a batch of particles; the batch version of get_movement_bucket.
+
+    Parameters:
+    - movement_model: a MovementModel
+    - xs: a numpy array of the x coordinates of the particles
+    - ys: a numpy array of the y coordinates of the particles
+
+    Returns:
+    - an integer numpy array of move table indexes
+    """
+    if movement_model.light_point is not None:
+        angles = np.arctan2(ys - movement_model.light_point[1], xs - movement_model.light_point[0])
+        return np.rint(angles * PHOTOTROPISM_DIRECTION_BUCKETS / (2 * math.pi)).astype(int) % PHOTOTROPISM_DIRECTION_BUCKETS
+    if movement_model.field_shape is not None:
+        columns, rows = movement_model.field_shape
+        column = np.clip((xs / movement_model.field_cell_size[0]).astype(int), 0, columns - 1)
+        row = np.clip((ys / movement_model.field_cell_size[1]).astype(int), 0, rows - 1)
+        return row * columns + column
+    return np.zeros(len(xs), dtype=int)
@@ -0,0 +1,232 @@
+import math
+import random
+import numpy as np
+import bplant1
+import planar_utils as pu
+import plant_growth as pg
+
+##################################
+# Morphology statistics of grown plants, and a harness for checking that an accelerated growth engine grows plants of
+# the same character as the reference engine. Faster engines don't reproduce the exact pixels of the reference, so
+# ensembles of plants grown from fixed seed sets are compared statistic by statistic with two-sample tests.
+#
+# An engine is a function (plant_genetics, seed) -> (deposits, center), where deposits are the (x,y) points at which
+# growth occurred, in order, and center is the (x,y) center of the seed.
+
+# the statistics of each plant that are compared across ensembles, with the KS distance below which a significant
+# difference is still tolerated. The bound only matters for large ensembles, where the test flags shifts too small to
+# change the character of a plant; at 30 plants a side, a significant distance is over 0.4, so any shift fails.
+SCALAR_STAT_TOLERANCES = {
+    'fractal_dimension': 0.15,
+    'gyration_exponent': 0.15,
+    'tip_fraction': 0.15,
+}
+# the deposit radii of every plant are pooled, so the samples aren't independent and the p-value overstates
+# significance; the KS distance itself is the better judge
+DEPOSIT_RADII_TOLERANCE = 0.15
+EQUIVALENCE_DEFAULT_ALPHA = 0.01
+
+##################################
+# STATISTICS
+
+def box_counting_dimension(points):
+    """
+    Estimate the fractal (box counting) dimension of a set of points, from the slope of log(boxes holding a point) against log(1 / box size).
+
+    Parameters:
+    - points: a list of (x,y) integer points
+
+    Returns:
+    - the estimated dimension; about 1 for a line and about 2 for a filled area
+    """
+    pts = np.array(points)
+    extent = max(1, int((pts.max(axis=0) - pts.min(axis=0)).max()))
+    box_sizes = [2 ** k for k in range(max(2, int(math.log2(extent)) - 1))]
+    box_counts = [len(np.unique((pts - pts.min(axis=0)) // size, axis=0)) for size in box_sizes]
+    slope, _ = np.polyfit(np.log(1 / np.array(box_sizes)), np.log(box_counts), 1)
+    return slope
+
+
+def gyration_exponent(deposits):
+    """
+    Estimate how the radius of gyration of a plant scales with its number of deposits, Rg ~ N^nu, from the slope of log(Rg) against log(N) over the growth order; nu is about 1 / the fractal dimension.
+
+    Parameters:
+    - deposits: a list of (x,y) points at which growth occurred, in order
+
+    Returns:
+    - the estimated exponent nu
+    """
+    pts = np.array(deposits, dtype=float)
+    counts = np.unique(np.geomspace(10, len(pts), 12).astype(int))
+    radii = [np.sqrt(((pts[:n] - pts[:n].mean(axis=0)) ** 2).sum(axis=1).mean()) for n in counts]
+    slope, _ = np.polyfit(np.log(counts), np.log(np.maximum(radii, 1e-9)), 1)
+    return slope
+
+
+def count_branch_tips(points):
+    """
+    Count the branch tips of a plant: the points with exactly one adjacent (8-box) point in the plant.
+
+    Parameters:
+    - points: a list of (x,y) points of the plant
+
+    Returns:
+    - the number of tips
+    """
+    point_set = set(points)
+    return sum(1 for point in point_set if sum(1 for adj in pu.get_adjacent_points(point) if adj in point_set) == 1)
+
+
+def deposit_radii(deposits, center):
+    """
+    Get the distance of each deposit from the center of the seed.
+
+    Parameters:
+    - deposits: a list of (x,y) points at which growth occurred
+    - center: the (x,y) center of the seed
+
+    Returns:
+    - a numpy array of distances
+    """
+    return np.hypot(*(np.array(deposits, dtype=float) - np.array(center)).T)
+
+
+def morphology_stats(deposits, center):
+    """
+    Get the morphology statistics of a grown plant.
+
+    Parameters:
+    - deposits: a list of (x,y) points at which growth occurred, in order
+    - center: the (x,y) center of the seed
+
+    Returns:
+    - a dict with the scalar statistics (see SCALAR_STAT_TOLERANCES) and 'deposit_radii', normalized by the largest radius so that plants of different spreads compare by shape
+    """
+    radii = deposit_radii(deposits, center)
+    return {
+        'fractal_dimension': box_counting_dimension(deposits),
+        'gyration_exponent': gyration_exponent(deposits),
+        'tip_fraction': count_branch_tips(deposits) / len(deposits),
+        'deposit_radii': radii / radii.max(),
+    }
+
+
+def ks_two_sample(sample_a, sample_b):
+    """
+    Two-sample Kolmogorov-Smirnov test: are the two samples drawn from the same distribution?
+
+    Parameters:
+    - sample_a: a sequence of numbers
+    - sample_b: a sequence of numbers
+
+    Returns:
+    - (distance, p_value): the largest gap between the empirical distribution functions, and the (asymptotic) probability of a gap at least that large if the distributions are the same
+    """
+    a, b = np.sort(sample_a), np.sort(sample_b)
+    values = np.concatenate([a, b])
+    distance = np.abs(np.searchsorted(a, values, side='right') / len(a) - np.searchsorted(b, values, side='right') / len(b)).max()
+    effective_n = math.sqrt(len(a) * len(b) / (len(a) + len(b)))
+    lam = (effective_n + 0.12 + 0.11 / effective_n) * distance
+    if lam < 1e-3:
+        return distance, 1.0
+    p_value = 2 * sum((-1) ** (k - 1) * math.exp(-2 * k * k * lam * lam) for k in range(1, 101))
+    return distance, min(1.0, max(0.0, p_value))
+
+##################################
+# ENGINES AND ENSEMBLES
+
+def reference_engine(plant_genetics, seed):
+    """
+    Grow a plant with the reference algorithm (bplant1.grow_plant from a bottom center seed).
+
+    Parameters:
+    - plant_genetics: the compiled configuration of how the plant grows (see genetics.compile_plant_genetics)
+    - seed: the random seed
+
+    Returns:
+    - (deposits, center)
+    """
+    random.seed(seed)
+    image = bplant1.setup_plant_image(plant_genetics)
+    center = pg.setup_plant_seed_bottom_center(image, plant_genetics.seed_radius, plant_genetics.color_rgb_plant)
+    return bplant1.grow_plant(plant_genetics, image, plant_genetics.seed_radius), center
+
+
+def multires_engine(plant_genetics, seed):
+    """
+    Grow a plant with the coarse to fine multires engine (bplant1.grow_plant_multires).
+
+    Parameters:
+    - plant_genetics: the compiled configuration of how the plant grows (see genetics.compile_plant_genetics)
+    - seed: the random seed
+
+    Returns:
+    - (deposits, center); the deposits are all the points of the final plant, in no particular order
+    """
+    random.seed(seed)
+    image, _ = bplant1.grow_plant_multires(plant_genetics)
+    deposits = pg.get_plant_points(image, plant_genetics.dead_colors)
+    # NOTE: the multires engine has no growth order; order the points by distance from the seed as a stand-in
+    center = plant_genetics.particle_inject_center
+    deposits.sort(key=lambda p: pu.distance_between(center, p))
+    return deposits, center
+
+
+def grow_ensemble(engine, plant_genetics, seeds):
+    """
+    Grow a plant for each seed with the given engine, and get the morphology statistics of each.
+
+    Parameters:
+    - engine: a function (plant_genetics, seed) -> (deposits, center)
+    - plant_genetics: the compiled configuration of how the plants grow (see genetics.compile_plant_genetics)
+    - seeds: the random seeds, one per plant
+
+    Returns:
+    - a list of morphology stats dicts (see morphology_stats), one per plant
+    """
+    ensemble_stats = []
+    for seed in seeds:
+        deposits, center = engine(plant_genetics, seed)
+        ensemble_stats.append(morphology_stats(deposits, center))
+    return ensemble_stats
+
+
+def compare_ensembles(reference_stats, candidate_stats, alpha=EQUIVALENCE_DEFAULT_ALPHA):
+    """
+    Compare the morphology statistics of two ensembles of plants, statistic by statistic. A statistic fails if the two-sample test tells the ensembles apart at the alpha level, unless the distance between them is within the (tight) tolerance.
+
+    Parameters:
+    - reference_stats: a list of morphology stats dicts, from the reference engine
+    - candidate_stats: a list of morphology stats dicts, from the candidate engine
+    - alpha: the significance level of the tests
+
+    Returns:
+    - a dict mapping each statistic to a (distance, p_value, passed) tuple
+    """
+    report = {}
+    for stat, tolerance in SCALAR_STAT_TOLERANCES.items():
+        distance, p_value = ks_two_sample([s[stat] for s in reference_stats], [s[stat] for s in candidate_stats])
+        report[stat] = (distance, p_value, p_value >= alpha or distance <= tolerance)
+    distance, p_value = ks_two_sample(np.concatenate([s['deposit_radii'] for s in reference_stats]),
+                                      np.concatenate([s['deposit_radii'] for s in candidate_stats]))
+    report['deposit_radii'] = (distance, p_value, distance <= DEPOSIT_RADII_TOLERANCE)
+    return report
+
+
+def assert_statistically_equivalent(reference_stats, candidate_stats, alpha=EQUIVALENCE_DEFAULT_ALPHA):
+    """
+    Assert that two ensembles of plants are statistically equivalent (see compare_ensembles).
+
+    Parameters:
+    - reference_stats: a list of morphology stats dicts, from the reference engine
+    - candidate_stats: a list of morphology stats dicts, from the candidate engine
+    - alpha: the significance level of the tests
+
+    Returns:
+    - the comparison report, if every statistic passes; otherwise raises an AssertionError describing the failures
+    """
+    report = compare_ensembles(reference_stats, candidate_stats, alpha)
+    failures = [f"{stat}: KS distance {distance:.3f}, p {p_value:.4f}" for stat, (distance, p_value, passed) in report.items() if not passed]
+    assert not failures, "Ensembles differ in " + "; ".join(failures)
+    return report
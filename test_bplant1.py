@@ -0,0 +1,43 @@
+import pytest
+import os
+import random
+import genetics as gn
+from bplant1 import *
+
+GENETICS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "plant_genetics.yaml")
+
+############################
+# TEST SUPPORT
+
+@pytest.fixture(autouse=True)
+def quiet_growth(monkeypatch):
+    monkeypatch.setattr('bplant1.DO_INCREMENTAL_OUTPUT', False)
+    monkeypatch.setattr('bplant1.DO_PROGRESS_LOGGING', False)
+
+############################
+# TESTS
+
+def test_grow_plant_from_mask_only_grows_next_to_the_plant():
+    random.seed(0)
+    # many particles in a narrow band, so that particles waiting near the plant are often overtaken by a new deposit
+    plant_genetics = gn.load_plant_genetics(GENETICS_PATH, width=48, height=48, grow_amount=150, particle_count=200,
+                                            mask_inject_inner_distance=2, mask_inject_outer_distance=3, mask_movement_max_distance=6)
+    seed_points = [(x, 40) for x in range(8, 40)]
+    image = setup_plant_image(plant_genetics)
+    pg.setup_plant_seed_mask(image.load(), seed_points, plant_genetics.color_rgb_plant)
+
+    deposits = grow_plant_from_mask(plant_genetics, image, seed_points)
+
+    assert len(deposits) == 150
+    assert len(set(deposits)) == len(deposits), "A point of the plant should never be grown on again"
+    assert not set(deposits) & set(seed_points), "The seed should never be grown on"
+
+
+def test_grow_plant_multires_grows_the_plant_mass_in_full_size_pixels():
+    random.seed(2)
+    plant_genetics = gn.load_plant_genetics(GENETICS_PATH, width=128, height=128, grow_amount=400)
+    image, level_times = grow_plant_multires(plant_genetics)
+
+    assert image.size == (128, 128) and len(level_times) == plant_genetics.multires_levels
+    plant_mass = len(pg.get_plant_points(image, plant_genetics.dead_colors))
+    assert abs(plant_mass - plant_genetics.grow_amount) <= 0.15 * plant_genetics.grow_amount, "The coarse levels should count their deposits as the pixels they upscale to"
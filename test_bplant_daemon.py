@@ -0,0 +1,91 @@
+import json
+import os
+from PIL import Image
+from bplant_daemon import *
+
+GENETICS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "plant_genetics.yaml")
+
+############################
+# TESTS
+
+def test_submit_and_claim_jobs(tmp_path):
+    spool_dir = str(tmp_path)
+    setup_spool(spool_dir)
+    submit_job(spool_dir, "job_a", {'seed': 1})
+    submit_job(spool_dir, "job_b", {'seed': 2})
+
+    claimed, failed = claim_jobs(spool_dir, 1)
+    assert len(claimed) == 1, "Only max_jobs jobs should be claimed"
+    assert failed == []
+    job_id, job = claimed[0]
+    assert os.path.exists(os.path.join(spool_dir, 'processing', f"{job_id}.json")), "A claimed job should move to the processing folder"
+    assert not os.path.exists(os.path.join(spool_dir, 'incoming', f"{job_id}.json")), "A claimed job should leave the incoming folder"
+
+    claimed_rest, _ = claim_jobs(spool_dir, 5)
+    assert len(claimed_rest) == 1
+    assert claimed_rest[0][0] != job_id, "A job should only be claimed once"
+
+
+def test_run_growth_job(tmp_path):
+    spool_dir = str(tmp_path / "spool")
+    output_dir = str(tmp_path / "out")
+    setup_spool(spool_dir)
+    os.makedirs(output_dir)
+    warm_worker(GENETICS_PATH)
+
+    job = {'seed': 3, 'genetics': {'grow_amount': 20, 'width': 64, 'height': 48}}
+    result = run_growth_job("thumb", job, spool_dir, output_dir)
+
+    assert result['deposit_count'] == 20
+    assert Image.open(result['output_path']).size == (64, 48), "Genetics overrides should apply to the grown plant"
+    with open(os.path.join(spool_dir, 'progress', "thumb.log")) as stream:
+        progress = stream.read()
+    assert "job thumb done" in progress, "Progress should be streamed to the job progress file"
+
+
+def test_finish_job_failed(tmp_path):
+    spool_dir = str(tmp_path)
+    setup_spool(spool_dir)
+    submit_job(spool_dir, "bad", {'genetics': {'grow_amount': 'lots'}})
+    claim_jobs(spool_dir, 1)
+
+    finish_job(spool_dir, "bad", None, "boom")
+
+    with open(os.path.join(spool_dir, 'failed', "bad.json")) as stream:
+        failed = json.load(stream)
+    assert failed['error'] == "boom"
+    assert failed['job']['genetics']['grow_amount'] == 'lots'
+    assert not os.listdir(os.path.join(spool_dir, 'processing'))
+
+
+def test_claim_jobs_fails_malformed_job_files(tmp_path):
+    spool_dir = str(tmp_path)
+    setup_spool(spool_dir)
+    with open(os.path.join(spool_dir, 'incoming', "truncated.json"), 'w') as stream:
+        stream.write('{"seed": 1, "genet')
+    submit_job(spool_dir, "good", {'seed': 2})
+
+    claimed, failed = claim_jobs(spool_dir, 5)
+
+    assert [job_id for job_id, job in claimed] == ["good"], "A malformed job file should not stop the other jobs being claimed"
+    assert failed == ["truncated"], "A malformed job file should be reported as failed"
+    with open(os.path.join(spool_dir, 'failed', "truncated.json")) as stream:
+        failed = json.load(stream)
+    assert failed['job_text'] == '{"seed": 1, "genet'
+    assert "JSONDecodeError" in failed['error']
+    assert os.listdir(os.path.join(spool_dir, 'processing')) == ["good.json"]
+
+
+def test_serve_counts_unreadable_jobs_as_finished(tmp_path):
+    spool_dir = str(tmp_path / "spool")
+    setup_spool(spool_dir)
+    with open(os.path.join(spool_dir, 'incoming', "truncated.json"), 'w') as stream:
+        stream.write('{"seed": 1, "genet')
+    for seed in range(3):
+        submit_job(spool_dir, f"job{seed}", {'seed': seed, 'genetics': {'grow_amount': 10, 'width': 32, 'height': 32}})
+
+    finished_count = serve(spool_dir, str(tmp_path / "out"), GENETICS_PATH, worker_count=1, once=True)
+
+    assert finished_count == 4, "A job failed while being claimed should count as finished"
+    assert len(os.listdir(os.path.join(spool_dir, 'done'))) == 3
+    assert os.listdir(os.path.join(spool_dir, 'failed')) == ["truncated.json"]
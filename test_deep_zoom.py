@@ -0,0 +1,66 @@
+import pytest
+import os
+import numpy as np
+from PIL import Image
+from deep_zoom import *
+
+############################
+# TEST SUPPORT
+
+def get_test_image(x=600, y=300, bg_rgb=(0, 0, 0)):
+    image = Image.new('RGBA', (x, y), bg_rgb + (255,))
+    return image
+
+############################
+# TESTS
+
+@pytest.mark.parametrize("width, height, expected", [
+    (1, 1, 1),
+    (256, 256, 9),
+    (600, 300, 11),
+])
+def test_get_level_count(width, height, expected):
+    assert get_level_count(width, height) == expected
+
+
+def test_get_level_size():
+    level_count = get_level_count(600, 300)
+    assert get_level_size(600, 300, level_count - 1, level_count) == (600, 300)
+    assert get_level_size(600, 300, level_count - 2, level_count) == (300, 150)
+    assert get_level_size(600, 300, 0, level_count) == (1, 1)
+
+
+def test_get_occupied_tiles():
+    image = get_test_image()
+    image.load()[300, 10] = (0, 128, 0, 255)
+    image.load()[599, 299] = (0, 128, 0, 255)
+    tiles = get_occupied_tiles(np.asarray(image), (0, 0, 0), 256)
+    assert sorted(tiles) == [(1, 0), (2, 1)], "Only tiles holding the plant should be occupied"
+    assert tiles[(2, 1)].shape == (300 - 256, 600 - 512, 4), "Edge tiles should be cropped to the image"
+
+
+def test_downsample_tiles():
+    tile = np.zeros((4, 4, 4), dtype=np.uint8)
+    tile[:, :] = (0, 0, 0, 255)
+    tile[0:2, 0:2] = (200, 100, 0, 255)
+    tiles = downsample_tiles({(1, 0): tile}, (4, 2), 4, (0, 0, 0, 255))
+    assert list(tiles) == [(0, 0)]
+    assert tiles[(0, 0)].shape == (2, 4, 4)
+    assert tuple(tiles[(0, 0)][0, 2]) == (200, 100, 0, 255), "A 2x2 block of one color should keep its color"
+    assert tuple(tiles[(0, 0)][0, 0]) == (0, 0, 0, 255), "Missing tiles should be background"
+
+
+def test_export_deep_zoom(tmp_path):
+    image = get_test_image()
+    image.load()[300, 10] = (0, 128, 0, 255)
+    output_base = str(tmp_path / "plant")
+
+    tile_count = export_deep_zoom(image, output_base, (0, 0, 0), tile_size=256)
+
+    assert tile_count == 11, "Only one tile per level should hold the plant"
+    assert os.path.exists(f"{output_base}_files/10/1_0.png")
+    assert not os.path.exists(f"{output_base}_files/10/0_0.png"), "Empty tiles should not be written"
+    assert Image.open(f"{output_base}_files/0/0_0.png").size == (1, 1)
+    with open(f"{output_base}.dzi") as stream:
+        dzi = stream.read()
+    assert 'Width="600" Height="300"' in dzi and 'TileSize="256"' in dzi
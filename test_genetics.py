@@ -0,0 +1,110 @@
+import pytest
+import os
+import pickle
+from PIL import Image
+import plant_growth as pg
+from genetics import *
+
+GENETICS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "plant_genetics.yaml")
+
+############################
+# TESTS
+
+def test_load_plant_genetics():
+    plant_genetics = load_plant_genetics(GENETICS_PATH, width=100, grow_amount=10)
+    assert plant_genetics.width == 100 and plant_genetics.grow_amount == 10, "Overrides should replace the values of the file"
+    assert plant_genetics.color_rgb_plant == tuple(read_plant_genetics(GENETICS_PATH)['color_rgb_plant']), "Colors should be tuples"
+    assert plant_genetics.particle_inject_center == (50, plant_genetics.height - 1)
+    assert plant_genetics.dead_colors == (plant_genetics.color_rgb_bg,)
+
+
+def test_strategies_are_resolved_to_functions():
+    plant_genetics = load_plant_genetics(GENETICS_PATH, movement_strategy='FULL_RANDOM_DRIFT', growth_strategy='ring')
+    assert plant_genetics.move_particle is pg.move_particle_random
+    assert plant_genetics.grow_at is pg.deposit_at
+    assert plant_genetics.growth_strategy == 'RING', "Strategy names should be matched case-insensitively"
+    assert load_plant_genetics(GENETICS_PATH, movement_strategy='GRAVITY').move_particle is pg.move_particle_biased
+
+
+def test_plant_genetics_are_frozen():
+    plant_genetics = load_plant_genetics(GENETICS_PATH)
+    with pytest.raises(AttributeError):
+        plant_genetics.width = 10
+    with pytest.raises(AttributeError):
+        plant_genetics.not_a_gene = 1
+
+
+def test_plant_genetics_lists_are_frozen():
+    plant_genetics = load_plant_genetics(GENETICS_PATH, forest_seed_locations=[[10, 20]])
+    for value in (plant_genetics.forest_seed_locations, plant_genetics.forest_seed_centers, plant_genetics.forest_plant_colors,
+                  plant_genetics.multires_grow_fractions, plant_genetics.movement_bias_field, plant_genetics.movement_bias_field[0]):
+        assert isinstance(value, tuple), "Lists in the genetics should be compiled to tuples, so they can't be changed in place"
+
+
+def test_replace():
+    plant_genetics = load_plant_genetics(GENETICS_PATH, width=100)
+    wider = plant_genetics.replace(width=200)
+    assert wider.width == 200 and wider.particle_inject_center == (100, wider.height - 1), "Derived genetics should follow the changes"
+    assert plant_genetics.width == 100, "The original should be unchanged"
+    with pytest.raises(GeneticsError, match="width"):
+        plant_genetics.replace(width=-1)
+
+
+def test_pickle_round_trip():
+    plant_genetics = load_plant_genetics(GENETICS_PATH, grow_amount=12)
+    restored = pickle.loads(pickle.dumps(plant_genetics))
+    assert restored.as_dict() == plant_genetics.as_dict()
+    assert restored.move_particle is plant_genetics.move_particle
+
+
+@pytest.mark.parametrize("overrides,message", [
+    ({'grow_amount': 'lots'}, "grow_amount must be an integer"),
+    ({'grow_amount': True}, "grow_amount must be an integer"),
+    ({'width': 0}, "width must be at least 1"),
+    ({'color_rgb_plant': [0, 128]}, "color_rgb_plant must be a list of 3 values"),
+    ({'color_rgb_plant': [0, 256, 0]}, "color_rgb_plant must be at most 255"),
+    ({'seed_location': 'MASK', 'seed_mask_path': None}, "The MASK seed location needs a seed_mask_path"),
+    ({'movement_strategy': 'TELEPORT'}, "movement_strategy must be one of FULL_RANDOM_DRIFT"),
+    ({'seed_location': 'TOP'}, "seed_location must be one of BOTTOM_CENTER, MASK"),
+    ({'offlattice_step_length': 0}, "offlattice_step_length must be greater than 0"),
+    ({'multires_grow_fractions': [0.5, 0.5]}, "multires_grow_fractions needs one fraction per level"),
+    ({'particle_injection_min_radius_factor': 3}, "particle_injection_min_radius_factor must be at most particle_injection_max_radius_factor"),
+    ({'forest_seed_locations': [[10, 10], [500, 500]]}, "forest_seed_locations must be within the 256x256 image"),
+    ({'mask_inject_outer_distance': 100}, "mask_inject_inner_distance <= mask_inject_outer_distance <= mask_movement_max_distance"),
+    ({'grow_ammount': 10}, "Unknown plant genetics: grow_ammount"),
+])
+def test_bad_genetics_are_reported(overrides, message):
+    with pytest.raises(GeneticsError, match=message):
+        load_plant_genetics(GENETICS_PATH, **overrides)
+
+
+def test_missing_genetics_are_reported():
+    raw_genetics = read_plant_genetics(GENETICS_PATH)
+    del raw_genetics['particle_count']
+    with pytest.raises(GeneticsError, match="Missing plant genetics: particle_count"):
+        compile_plant_genetics(raw_genetics)
+
+
+def test_forest_genetics_default_when_absent():
+    raw_genetics = read_plant_genetics(GENETICS_PATH)
+    for key in ('forest_seed_count', 'forest_seed_locations', 'forest_plant_colors'):
+        del raw_genetics[key]
+    plant_genetics = compile_plant_genetics(raw_genetics)
+    assert plant_genetics.forest_seed_count == PLANT_GENETICS_DEFAULTS['forest_seed_count']
+    assert len(plant_genetics.forest_seed_centers) == plant_genetics.forest_seed_count
+
+
+def test_baseline_genetics_load_with_defaults():
+    # a genetics file from before the mode-specific genetics existed holds only the core genetics
+    raw_genetics = {key: value for key, value in read_plant_genetics(GENETICS_PATH).items() if key not in PLANT_GENETICS_DEFAULTS}
+    plant_genetics = compile_plant_genetics(raw_genetics)
+    assert plant_genetics.movement_strategy == 'FULL_RANDOM_DRIFT' and plant_genetics.grow_at is pg.deposit_at
+    assert plant_genetics.seed_mask_path is None and plant_genetics.seed_mask_points is None
+    assert plant_genetics.depth == PLANT_GENETICS_DEFAULTS['depth']
+
+
+def test_seed_mask_without_room_to_inject_is_reported(tmp_path):
+    mask_path = str(tmp_path / "mask.png")
+    Image.new('L', (64, 64), 255).save(mask_path)
+    with pytest.raises(GeneticsError, match="leaves no room to inject particles"):
+        load_plant_genetics(GENETICS_PATH, width=64, height=64, seed_location='MASK', seed_mask_path=mask_path)
@@ -0,0 +1,95 @@
+import math
+import os
+import random
+import genetics as gn
+import planar_utils as pu
+from offlattice import *
+
+############################
+# TEST SUPPORT
+
+def get_offlattice_genetics(grow_amount=50):
+    return gn.load_plant_genetics(os.path.join(os.path.dirname(os.path.abspath(__file__)), "plant_genetics.yaml"),
+                                  width=64, height=64, seed_radius=2, grow_amount=grow_amount)
+
+############################
+# TESTS
+
+def test_get_cell():
+    assert get_cell((0.5, 0.5), 1) == (0, 0)
+    assert get_cell((2.5, 3.99), 1) == (2, 3)
+    assert get_cell((-0.1, 4.0), 2) == (-1, 2)
+
+
+def test_add_deposit():
+    deposit_hashes = setup_deposit_hashes(1.0)
+    add_deposit(deposit_hashes, (2.5, 3.5))
+    add_deposit(deposit_hashes, (2.7, 3.1))
+    assert deposit_hashes['cells'] == {(2, 3): [(2.5, 3.5), (2.7, 3.1)]}
+    assert deposit_hashes['coarse_cells'] == {(0, 0)}
+
+
+def test_get_jump_length():
+    deposit_hashes = setup_deposit_hashes(1.0)
+    add_deposit(deposit_hashes, (4.0, 4.0))
+    assert get_jump_length(deposit_hashes, (12.0, 4.0)) == 0, "A particle in a coarse cell next to a deposit should take small steps"
+    jump_length = get_jump_length(deposit_hashes, (40.0, 4.0))
+    assert jump_length == 7.0
+    assert pu.distance_between((40.0, 4.0), (4.0, 4.0)) - 1.0 >= jump_length, "A jump should never reach a deposit"
+
+
+def test_get_first_contact():
+    deposit_hashes = setup_deposit_hashes(1.0)
+    add_deposit(deposit_hashes, (5.0, 5.0))
+    assert math.isclose(get_first_contact(deposit_hashes, (3.5, 5.0), (1.0, 0.0)), 0.5), "Should touch when the centers are one contact distance apart"
+    assert get_first_contact(deposit_hashes, (3.5, 5.0), (-1.0, 0.0)) is None, "Moving away should touch nothing"
+    assert get_first_contact(deposit_hashes, (3.5, 7.0), (1.0, 0.0)) is None, "Passing by should touch nothing"
+    assert get_first_contact(deposit_hashes, (4.5, 5.0), (0.0, 1.0)) == 0.0, "An overlapping particle touches at once"
+
+
+def test_is_touching_deposit():
+    deposit_hashes = setup_deposit_hashes(1.0)
+    add_deposit(deposit_hashes, (5.0, 5.0))
+    assert is_touching_deposit(deposit_hashes, (5.5, 5.5))
+    assert is_touching_deposit(deposit_hashes, (4.1, 5.0)), "Should find deposits in neighbouring cells"
+    assert not is_touching_deposit(deposit_hashes, (6.0, 6.0))
+
+
+def test_injected_particle_offlattice():
+    bounds = ((0.0, 0.0), (20.0, 20.0))
+    deposit_hashes = setup_deposit_hashes(1.0)
+    for x in range(10):
+        add_deposit(deposit_hashes, (10.0 + x * 0.5, 15.0))
+    for _ in range(100):
+        p = injected_particle_offlattice(deposit_hashes, (10.0, 19.0), 3, 5, bounds)
+        assert 3 <= pu.distance_between((10.0, 19.0), p) <= 5
+        assert pu.is_point_in_rect(p, bounds)
+        assert not is_touching_deposit(deposit_hashes, p), "Particles should never be injected over the plant"
+
+
+def test_setup_offlattice_seed():
+    deposit_hashes = setup_deposit_hashes(1.0)
+    seed = setup_offlattice_seed(deposit_hashes, (10.0, 10.0), 1)
+    assert sorted(seed) == [(9.0, 10.0), (10.0, 9.0), (10.0, 10.0), (10.0, 11.0), (11.0, 10.0)]
+    assert sum(len(deposits) for deposits in deposit_hashes['cells'].values()) == 5
+
+
+def test_grow_plant_offlattice():
+    random.seed(3)
+    plant_genetics = get_offlattice_genetics()
+    growth_counts = []
+    seed, deposits = grow_plant_offlattice(plant_genetics, growth_counts.append)
+    assert len(deposits) == 50
+    assert growth_counts == list(range(1, 51))
+
+    contact_distance = 2 * plant_genetics.offlattice_deposit_radius
+    for i, deposit in enumerate(deposits):
+        nearest = min(pu.distance_between(deposit, other) for other in seed + deposits[:i])
+        assert math.isclose(nearest, contact_distance, abs_tol=1e-6), "Each deposit should just touch an earlier one"
+
+
+def test_render_offlattice():
+    image = render_offlattice([(4.0, 4.0)], 1.0, 8, 8, 2, (0, 0, 0, 255), (0, 255, 0))
+    assert image.size == (16, 16)
+    assert image.getpixel((8, 8)) == (0, 255, 0, 255)
+    assert image.getpixel((0, 0)) == (0, 0, 0, 255)
@@ -0,0 +1,45 @@
+import numpy as np
+from PIL import Image
+import particle_tracing
+from particle_tracing import *
+
+############################
+# TESTS
+
+def test_record_visit_buffers_until_full(monkeypatch):
+    monkeypatch.setattr(particle_tracing, 'VISIT_BUFFER_SIZE', 3)
+    visit_counts = setup_visit_counts(4, 3)
+    visit_buffer = []
+
+    record_visit(visit_counts, visit_buffer, (1, 2))
+    record_visit(visit_counts, visit_buffer, (1, 2))
+    assert visit_counts.sum() == 0, "Visits should be buffered"
+
+    record_visit(visit_counts, visit_buffer, (3, 0))
+    assert visit_buffer == [], "A full buffer should be flushed"
+    assert visit_counts[2, 1] == 2 and visit_counts[0, 3] == 1, "Repeat visits should all be counted"
+
+
+def test_flush_visit_buffer():
+    visit_counts = setup_visit_counts(4, 3)
+    visit_buffer = [(0, 0), (0, 0), (2, 1)]
+    flush_visit_buffer(visit_counts, visit_buffer)
+    assert visit_counts[0, 0] == 2 and visit_counts[1, 2] == 1 and visit_counts.sum() == 3
+    flush_visit_buffer(visit_counts, visit_buffer)
+    assert visit_counts.sum() == 3, "Flushing an empty buffer should change nothing"
+
+
+def test_get_heatmap_colors():
+    visit_counts = np.array([[0, 1, 1000]])
+    colors = get_heatmap_colors(visit_counts)
+    assert tuple(colors[0, 0]) == (0, 0, 0), "Unvisited points should be black"
+    assert tuple(colors[0, 2]) == (255, 255, 255), "The most visited points should be white"
+    assert colors[0, 1, 0] > 0 and colors[0, 1, 2] == 0, "Rarely visited points should be reddish"
+
+
+def test_render_visit_heatmap():
+    image = Image.new('RGBA', (2, 1), (0, 128, 0, 255))
+    visit_counts = np.array([[0, 5]])
+    heatmap = render_visit_heatmap(image, visit_counts, opacity=1)
+    assert heatmap.getpixel((0, 0)) == (0, 128, 0), "Unvisited points should show the plant image"
+    assert heatmap.getpixel((1, 0)) == (255, 255, 255)
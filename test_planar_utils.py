@@ -1,5 +1,6 @@
 import pytest
 import math
+import numpy as np
 from planar_utils import *
 
 def test_distance_between():
@@ -149,3 +150,45 @@ def test_filter_points_within_bounding_box():
 
 
 
+
+
+def test_compute_distance_field():
+    field = compute_distance_field([(0, 0), (9, 9)], 10, 10, 3)
+    assert field[0][0] == 0 and field[9][9] == 0
+    assert field[2][1] == 2, "Distance should be the number of 8-adjacent steps"
+    assert field[3][3] == 3
+    assert field[5][4] == 4, "Distances beyond max_distance should be max_distance + 1"
+    assert field[7][8] == 2
+    assert len(field) == 10 and len(field[0]) == 10
+
+
+def test_update_distance_field():
+    field = compute_distance_field([(0, 0)], 10, 10, 3)
+    update_distance_field(field, (6, 6), 3)
+    assert np.array_equal(field, compute_distance_field([(0, 0), (6, 6)], 10, 10, 3)), "An incremental update should match a full recompute"
+    update_distance_field(field, (9, 0), 3)
+    assert np.array_equal(field, compute_distance_field([(0, 0), (6, 6), (9, 0)], 10, 10, 3)), "An update at the edge should match a full recompute"
+
+
+def test_compute_distance_field_matches_chessboard_distance():
+    rng = np.random.default_rng(1)
+    points = [tuple(p) for p in rng.integers(0, 40, size=(12, 2)).tolist()] + [(-3, 5), (60, 60)]
+    field = compute_distance_field(points, 40, 30, 6)
+    xs, ys = np.meshgrid(np.arange(40), np.arange(30), indexing='ij')
+    expected = np.full((40, 30), 7)
+    for x, y in points:
+        if not (0 <= x < 40 and 0 <= y < 30):
+            continue
+        expected = np.minimum(expected, np.maximum(np.abs(xs - x), np.abs(ys - y)))
+    assert np.array_equal(field, np.minimum(expected, 7)), "Points outside the grid should be ignored"
+
+
+@pytest.mark.parametrize("point,box,expected", [
+    ((5, 5), ((0, 0), (10, 10)), False),  # Inside
+    ((0, 5), ((0, 0), (10, 10)), True),  # Left edge
+    ((5, 10), ((0, 0), (10, 10)), True),  # Bottom edge
+    ((10, 10), ((0, 0), (10, 10)), True),  # Lower right corner
+    ((11, 5), ((0, 0), (10, 10)), False),  # Outside
+])
+def test_is_point_on_rect_edge(point, box, expected):
+    assert is_point_on_rect_edge(point, box) == expected
@@ -1,5 +1,6 @@
 import pytest
 import math
+from types import SimpleNamespace
 from PIL import Image
 import planar_utils as pu
 from plant_growth import *
@@ -118,9 +119,9 @@ def test_setup_plant_seed_bottom_center():
 
 
 @pytest.mark.parametrize("base_radius,plant_genetics,expected", [
-    (10, {'particle_injection_min_radius_factor': 0.5,'particle_injection_max_radius_factor': 1.5,'particle_movement_max_radius_extension': 5,'max_particle_inject_inner_radius': 20}, (5, 15, 20)),  # Case where max_inner_radius is not limiting
-    (10, {'particle_injection_min_radius_factor': 0.8,'particle_injection_max_radius_factor': 2.0,'particle_movement_max_radius_extension': 10,'max_particle_inject_inner_radius': 5}, (5, 20, 30)),  # Case where max_inner_radius is limiting
-    (10, {'particle_injection_min_radius_factor': 1.0,'particle_injection_max_radius_factor': 2.0,'particle_movement_max_radius_extension': 0,'max_particle_inject_inner_radius': 15}, (10, 20, 20)),  # Case with no movement extension
+    (10, SimpleNamespace(**{'particle_injection_min_radius_factor': 0.5,'particle_injection_max_radius_factor': 1.5,'particle_movement_max_radius_extension': 5,'max_particle_inject_inner_radius': 20}), (5, 15, 20)),  # Case where max_inner_radius is not limiting
+    (10, SimpleNamespace(**{'particle_injection_min_radius_factor': 0.8,'particle_injection_max_radius_factor': 2.0,'particle_movement_max_radius_extension': 10,'max_particle_inject_inner_radius': 5}), (5, 20, 30)),  # Case where max_inner_radius is limiting
+    (10, SimpleNamespace(**{'particle_injection_min_radius_factor': 1.0,'particle_injection_max_radius_factor': 2.0,'particle_movement_max_radius_extension': 0,'max_particle_inject_inner_radius': 15}), (10, 20, 20)),  # Case with no movement extension
 ])
 def test_get_particle_action_radii_from_base_radius(base_radius, plant_genetics, expected):
     assert get_particle_action_radii_from_base_radius(base_radius, plant_genetics) == expected
@@ -151,9 +152,9 @@ def test_get_particle_within_movement_bounds_ring():
 
 @pytest.mark.parametrize("particle_that_grew, plant_radius, plant_genetics, expected", [
     # Test case where growth occurs within the existing radius
-    ((5, 5), 10, {'particle_inject_center': (0, 0), 'particle_injection_min_radius_factor': 0.5,'particle_injection_max_radius_factor': 1.5,'particle_movement_max_radius_extension': 5,'max_particle_inject_inner_radius': 20}, None),
+    ((5, 5), 10, SimpleNamespace(**{'particle_inject_center': (0, 0), 'particle_injection_min_radius_factor': 0.5,'particle_injection_max_radius_factor': 1.5,'particle_movement_max_radius_extension': 5,'max_particle_inject_inner_radius': 20}), None),
     # Test case where growth occurs outside the existing radius, expanding it
-    ((0, 20), 10, {'particle_inject_center': (0, 0), 'particle_injection_min_radius_factor': 0.5,'particle_injection_max_radius_factor': 1.5,'particle_movement_max_radius_extension': 5,'max_particle_inject_inner_radius': 20}, (20, 10, 30, 35)),
+    ((0, 20), 10, SimpleNamespace(**{'particle_inject_center': (0, 0), 'particle_injection_min_radius_factor': 0.5,'particle_injection_max_radius_factor': 1.5,'particle_movement_max_radius_extension': 5,'max_particle_inject_inner_radius': 20}), (20, 10, 30, 35)),
 ])
 def test_grow_radii(particle_that_grew, plant_radius, plant_genetics, expected):
     result = grow_radii(particle_that_grew, plant_radius, plant_genetics)
@@ -168,3 +169,197 @@ def test_grow_radii(particle_that_grew, plant_radius, plant_genetics, expected):
 
 
 
+
+
+def test_get_forest_seed_layout():
+    seed_centers = get_forest_seed_layout(3, 100, 50)
+    assert seed_centers == [(25, 49), (50, 49), (75, 49)]
+
+
+def test_setup_plant_seeds():
+    image = get_test_image(20, 10)
+    pixels = image.load()
+    ownership = {}
+    colors = [(0, 128, 0), (0, 0, 128)]
+    setup_plant_seeds(pixels, [(5, 9), (15, 9)], 2, colors, ownership, ((0, 0), (19, 9)))
+
+    assert ownership[(5, 9)] == 0 and ownership[(15, 9)] == 1
+    assert pixels[5, 9] == colors[0] and pixels[15, 9] == colors[1], "Each seed should be drawn in its own plant color"
+    assert all(pu.is_point_in_rect(p, ((0, 0), (19, 9))) for p in ownership), "Seed points should stay within the bounds"
+    assert (5, 7) in ownership and (6, 6) not in ownership, "Seeds should be round"
+
+
+@pytest.mark.parametrize("point, expected", [
+    ((3, 3), 1),  # adjacent to a point owned by plant 1
+    ((8, 8), None),  # nothing owned nearby
+])
+def test_get_adjacent_owner(point, expected):
+    ownership = {(4, 4): 1}
+    assert get_adjacent_owner(point, ownership) == expected
+
+
+def test_injected_particle_forest():
+    bounding_box = ((0, 0), (200, 100))
+    plant_extents = [((50, 99), 10, 20, 40), ((150, 99), 5, 30, 50)]
+    for _ in range(20):
+        particle = injected_particle_forest(plant_extents, bounding_box)
+        assert pu.is_point_in_rect(particle, bounding_box), "The particle is not within the image bounds"
+        # NOTE: the -1 and +1 are there to handle edge cases caused by integer casting of points
+        assert any(inner - 1 <= pu.distance_between(center, particle) <= outer + 1 for center, inner, outer, _ in plant_extents), "The particle is not within any injection ring"
+
+
+def test_injected_particle_forest_gives_up_off_the_image():
+    bounding_box = ((0, 0), (200, 100))
+    with pytest.raises(ValueError, match="No injection point"):
+        injected_particle_forest([((500, 500), 5, 10, 30)], bounding_box)
+
+
+def test_get_particle_within_movement_bounds_forest():
+    bounding_box = ((0, 0), (200, 100))
+    plant_extents = [((50, 99), 10, 20, 40), ((150, 99), 5, 30, 50)]
+
+    near_second_plant = (150, 55)
+    assert get_particle_within_movement_bounds_forest(near_second_plant, plant_extents, bounding_box) == near_second_plant
+
+    far_particle = (100, 0)
+    new_particle = get_particle_within_movement_bounds_forest(far_particle, plant_extents, bounding_box)
+    assert new_particle != far_particle, "A new particle should be injected if the original is outside the movement bounds of every plant"
+
+
+def test_load_seed_mask(tmp_path):
+    mask = Image.new('L', (10, 10), 0)
+    mask.load()[3, 4] = 255
+    mask.load()[5, 5] = 100
+    mask_path = str(tmp_path / "mask.png")
+    mask.save(mask_path)
+
+    assert load_seed_mask(mask_path, 10, 10) == [(3, 4)]
+    assert load_seed_mask(mask_path, 20, 20) == [(6, 8), (6, 9), (7, 8), (7, 9)], "The mask should be scaled to the image size"
+
+
+def test_get_plant_radius():
+    assert get_plant_radius([(50, 99), (53, 95), (48, 99)], (50, 99)) == 5
+    assert get_plant_radius([], (50, 99)) == 0
+
+
+def test_injected_particle_distance_band():
+    plant_points = [(x, 40) for x in range(10, 90)]  # a horizontal line
+    distance_field = pu.compute_distance_field(plant_points, 100, 100, 20)
+    distance_band = setup_distance_band(distance_field, 3, 8)
+    for _ in range(20):
+        particle = injected_particle_distance_band(distance_band)
+        assert 3 <= distance_field[particle] <= 8, "The particle is not within the distance band"
+
+
+def test_injected_particle_distance_band_empty():
+    distance_field = pu.compute_distance_field([(x, y) for x in range(10) for y in range(10)], 10, 10, 20)
+    with pytest.raises(ValueError, match="No point is between 3 and 8 steps"):
+        injected_particle_distance_band(setup_distance_band(distance_field, 3, 8))
+
+
+def test_update_distance_band():
+    distance_field = pu.compute_distance_field([(20, 20)], 60, 60, 10)
+    distance_band = setup_distance_band(distance_field, 3, 5)
+    for point in [(25, 20), (30, 20), (40, 40), (0, 0)]:
+        pu.update_distance_field(distance_field, point, 10)
+        update_distance_band(distance_band, distance_field, point, 10)
+        expected = setup_distance_band(distance_field, 3, 5)
+        assert sorted(distance_band['cells']) == sorted(expected['cells']), "An incremental update should match a fresh band"
+        assert all(distance_band['cells'][i] == cell for cell, i in distance_band['cell_indexes'].items())
+
+
+def test_get_particle_within_movement_bounds_distance():
+    plant_points = [(x, 40) for x in range(10, 90)]
+    distance_field = pu.compute_distance_field(plant_points, 100, 100, 20)
+    distance_band = setup_distance_band(distance_field, 3, 8)
+    bounding_box = ((0, 0), (99, 99))
+
+    near_particle = (85, 55)
+    assert get_particle_within_movement_bounds_distance(near_particle, distance_field, distance_band, 20, bounding_box) == near_particle
+
+    far_particle = (50, 95)
+    new_particle = get_particle_within_movement_bounds_distance(far_particle, distance_field, distance_band, 20, bounding_box)
+    assert 3 <= distance_field[new_particle] <= 8, "A new particle should be injected if the original is too far from the plant"
+
+
+def test_get_particle_within_movement_bounds_ring_absorb_at_edges():
+    bounding_box = ((0, 0), (200, 200))
+    edge_particle = (0, 60)
+    assert get_particle_within_movement_bounds_ring(edge_particle, (50, 50), 5, 10, 100, bounding_box) == edge_particle
+    new_particle = get_particle_within_movement_bounds_ring(edge_particle, (50, 50), 5, 10, 100, bounding_box, absorb_at_edges=True)
+    assert new_particle != edge_particle, "A particle at the edge should be re-injected when absorbing at edges"
+
+
+@pytest.mark.parametrize("weights", [
+    [1, 1, 1, 1],
+    [1, 2, 3, 4],
+    [0, 5, 0, 1],
+])
+def test_build_alias_table(weights):
+    prob, alias = build_alias_table(weights)
+    # the probability of each index is its own share of its column plus what other columns alias to it
+    n = len(weights)
+    sampled = [prob[i] / n for i in range(n)]
+    for i in range(n):
+        sampled[alias[i]] += (1 - prob[i]) / n
+    for i in range(n):
+        assert math.isclose(sampled[i], weights[i] / sum(weights), abs_tol=1e-9)
+
+
+def test_sample_alias_table():
+    prob, alias = build_alias_table([0, 5, 0, 1])
+    samples = [sample_alias_table(prob, alias) for _ in range(200)]
+    assert set(samples) <= {1, 3}, "Indexes with no weight should never be sampled"
+
+
+def test_get_bias_move_weights():
+    weights = get_bias_move_weights((0, 1), 1.0)
+    assert max(range(8), key=lambda i: weights[i]) == ADJACENT_OFFSETS.index((0, 1)), "The heaviest move should be in the bias direction"
+    assert get_bias_move_weights((0, 0), 1.0) == [1.0] * 8
+
+
+def test_move_particle_gravity():
+    bounding_box = ((0, 0), (100, 100))
+    movement_model = setup_movement_model('GRAVITY', bounding_box, 2.0)
+    moved_points = [move_particle((50, 50), bounding_box, 'GRAVITY', movement_model) for _ in range(200)]
+    assert all(pu.distance_between((50, 50), p) <= math.sqrt(2) + .001 for p in moved_points), "The point did not move to an adjacent position"
+    assert sum(p[1] - 50 for p in moved_points) > 0, "Gravity should move points down on average"
+
+
+@pytest.mark.parametrize("point, expected_bucket", [
+    ((100, 50), 0),  # to the right of the light
+    ((50, 100), 4),  # below the light
+])
+def test_get_movement_bucket_phototropism(point, expected_bucket):
+    movement_model = setup_movement_model('PHOTOTROPISM', ((0, 0), (100, 100)), 1.0, light_point=(50, 50))
+    assert get_movement_bucket(movement_model, point) == expected_bucket
+    assert get_movement_buckets(movement_model, np.array([point[0]]), np.array([point[1]]))[0] == expected_bucket
+
+
+def test_get_movement_bucket_bias_field():
+    movement_model = setup_movement_model('BIAS_FIELD', ((0, 0), (99, 99)), 1.0, bias_field=[[(0, 1), (1, 0)], [(0, -1), (-1, 0)]])
+    assert len(movement_model.tables) == 4
+    assert get_movement_bucket(movement_model, (10, 10)) == 0
+    assert get_movement_bucket(movement_model, (60, 10)) == 1
+    assert get_movement_bucket(movement_model, (60, 60)) == 3
+    assert list(get_movement_buckets(movement_model, np.array([10, 60, 60]), np.array([10, 10, 60]))) == [0, 1, 3]
+
+
+def test_move_particles_batch():
+    bounding_box = ((0, 0), (10, 10))
+    movement_model = setup_movement_model('WIND', bounding_box, 2.0, wind_direction=(1, 0))
+    rng = np.random.default_rng(1)
+    xs, ys = np.array([0, 5, 10] * 100), np.array([0, 5, 10] * 100)
+    moved_xs, moved_ys = move_particles_batch(xs, ys, bounding_box, movement_model, rng)
+    assert moved_xs.min() >= 0 and moved_xs.max() <= 10 and moved_ys.min() >= 0 and moved_ys.max() <= 10, "Moved particles should stay within the bounding box"
+    assert np.abs(moved_xs - xs).max() <= 1 and np.abs(moved_ys - ys).max() <= 1, "Particles should move to adjacent positions"
+    assert (moved_xs - xs)[1::3].mean() > 0, "Wind should move points in its direction on average"
+
+
+def test_get_plant_points():
+    image = get_test_image(5, 5)
+    pixels = image.load()
+    pixels[1, 2] = (0, 128, 0)
+    pixels[4, 4] = (0, 128, 0)
+    pixels[3, 0] = (9, 9, 9)
+    assert get_plant_points(image, [(0, 0, 0), (9, 9, 9)]) == [(1, 2), (4, 4)]
@@ -0,0 +1,109 @@
+import pytest
+import os
+import random
+import numpy as np
+import genetics as gn
+from voxel_growth import *
+
+############################
+# TEST SUPPORT
+
+def get_voxel_genetics(grow_amount=200, **overrides):
+    return gn.load_plant_genetics(os.path.join(os.path.dirname(os.path.abspath(__file__)), "plant_genetics.yaml"),
+                                  width=48, height=48, depth=40, seed_radius=2, grow_amount=grow_amount, **overrides)
+
+############################
+# TESTS
+
+def test_voxel_store_is_sparse():
+    voxel_store = setup_voxel_store((100, 100, 100))
+    assert voxel_store['directory'].shape == (7, 7, 7)
+    assert voxel_store['chunk_count'] == 0
+
+    voxels = np.array([(0, 0, 0), (1, 0, 0), (99, 99, 99)])
+    set_voxel_flags(voxel_store, voxels, VOXEL_OCCUPIED)
+    assert voxel_store['chunk_count'] == 2, "Only the chunks touched should be allocated"
+    assert list(get_voxel_flags(voxel_store, np.array([(1, 0, 0), (2, 0, 0), (50, 50, 50), (99, 99, 99)]))) == [VOXEL_OCCUPIED, 0, 0, VOXEL_OCCUPIED]
+
+    set_voxel_flags(voxel_store, voxels[:1], VOXEL_STICKY)
+    assert get_voxel_flags(voxel_store, voxels[:1])[0] == VOXEL_OCCUPIED | VOXEL_STICKY, "Setting flags should keep the others"
+
+
+def test_voxel_store_grows_its_chunk_stack():
+    voxel_store = setup_voxel_store((256, 256, 16))
+    voxels = np.array([(x, y, 0) for x in range(0, 256, 16) for y in range(0, 256, 16)])
+    set_voxel_flags(voxel_store, voxels, VOXEL_OCCUPIED)
+    assert voxel_store['chunk_count'] == 256
+    assert (get_voxel_flags(voxel_store, voxels) == VOXEL_OCCUPIED).all()
+    assert sorted(map(tuple, get_occupied_voxels(voxel_store))) == sorted(map(tuple, voxels))
+
+
+def test_deposit_voxels():
+    voxel_store = setup_voxel_store((10, 10, 10))
+    deposit_voxels(voxel_store, np.array([(0, 0, 0)]))
+    assert get_voxel_flags(voxel_store, np.array([(0, 0, 0)]))[0] == VOXEL_OCCUPIED | VOXEL_STICKY
+    assert list(get_voxel_flags(voxel_store, np.array([(1, 1, 1), (1, 0, 0), (2, 0, 0)]))) == [VOXEL_STICKY, VOXEL_STICKY, 0], "The 26 neighbours should be sticky"
+
+
+def test_setup_voxel_seed():
+    voxel_store = setup_voxel_store((20, 20, 20))
+    seed = setup_voxel_seed(voxel_store, (10, 19, 10), 1)
+    assert sorted(map(tuple, seed)) == [(9, 19, 10), (10, 18, 10), (10, 19, 9), (10, 19, 10), (10, 19, 11), (11, 19, 10)], "The seed should be clipped to the volume"
+
+
+def test_get_voxel_move_weights():
+    offsets = NEIGHBOUR_OFFSETS_3D
+    assert np.allclose(get_voxel_move_weights('FULL_RANDOM_DRIFT', 2, (1, 0)), 1 / 26)
+    gravity = get_voxel_move_weights('GRAVITY', 2, (1, 0))
+    assert gravity[offsets[:, 1] > 0].sum() > 0.5, "Gravity should favour moving down"
+    wind = get_voxel_move_weights('WIND', 2, (-1, 0))
+    assert wind[offsets[:, 0] < 0].sum() > 0.5, "Wind should favour moving with the wind"
+    with pytest.raises(ValueError):
+        get_voxel_move_weights('PHOTOTROPISM', 2, (1, 0))
+
+
+def test_injected_particles_shell():
+    voxel_store = setup_voxel_store((40, 40, 40))
+    setup_voxel_seed(voxel_store, (20, 39, 20), 3)
+    particles = injected_particles_shell(voxel_store, 200, (20, 39, 20), 2, 8, np.random.default_rng(0))
+    assert particles.shape == (200, 3)
+    assert ((particles >= 0) & (particles < 40)).all(), "Particles should be injected within the volume"
+    distances = np.linalg.norm(particles - (20, 39, 20), axis=1)
+    assert (distances <= 8.5).all()
+    assert (get_voxel_flags(voxel_store, particles) == 0).all(), "Particles should never be injected on or next to the plant"
+
+
+def test_grow_plant_voxel():
+    random.seed(4)
+    growth_counts = []
+    seed, deposits, voxel_store = grow_plant_voxel(get_voxel_genetics(), growth_counts.append)
+    assert len(deposits) == 200
+    assert growth_counts[-1] == 200 and growth_counts == sorted(growth_counts)
+    assert len(np.unique(deposits, axis=0)) == 200, "Each voxel should grow once"
+
+    plant = set(map(tuple, seed))
+    for deposit in map(tuple, deposits):
+        assert deposit not in plant
+        assert any(tuple(np.add(deposit, offset)) in plant for offset in NEIGHBOUR_OFFSETS_3D), "Each deposit should touch the plant grown before it"
+        plant.add(deposit)
+    assert set(map(tuple, get_occupied_voxels(voxel_store))) == plant
+
+
+def test_save_voxels_ply(tmp_path):
+    ply_path = str(tmp_path / "plant.ply")
+    save_voxels_ply(np.array([(1, 2, 3), (4, 9, 6)]), ply_path, 10, (0, 128, 0))
+    with open(ply_path, 'rb') as stream:
+        data = stream.read()
+    header, body = data.split(b"end_header\n")
+    assert b"element vertex 2" in header
+    vertices = np.frombuffer(body, dtype=[('x', '<f4'), ('y', '<f4'), ('z', '<f4'), ('red', 'u1'), ('green', 'u1'), ('blue', 'u1')])
+    assert list(vertices['y']) == [7, 0], "The y axis should be flipped so that +y is up"
+    assert list(vertices['green']) == [128, 128]
+
+
+def test_render_voxel_projection():
+    image = render_voxel_projection(np.array([(1, 2, 0), (1, 2, 9), (3, 3, 9)]), 5, 4, 10, (0, 0, 0, 255), (0, 200, 0))
+    assert image.size == (5, 4)
+    assert image.getpixel((1, 2)) == (0, 200, 0, 255), "The nearest voxel should be drawn at full brightness"
+    assert image.getpixel((3, 3))[1] < 200, "Farther voxels should be drawn darker"
+    assert image.getpixel((0, 0)) == (0, 0, 0, 255)
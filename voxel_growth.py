@@ -0,0 +1,419 @@
+from PIL import Image
+import argparse
+import math
+import random
+import sys
+import time
+import numpy as np
+import genetics as gn
+import plant_growth as pg
+
+##################################
+# 3D voxel growth: the plant grows in a width x height x depth volume (x across, y down as in the 2D images, z into
+# the picture) from a round seed at the bottom center. Particles are injected in a spherical shell around the seed and
+# walk to any of their 26 neighbours; a particle sticks on reaching a voxel next to the plant.
+#
+# 3D walks are long, so many particles are stepped together with numpy, several steps at a time: each walk block
+# draws the next voxel_walk_block_steps steps of every particle at once, and finds where each first reaches the plant
+# or leaves the movement sphere. All the deposits of a block touch the plant as it was at the start of the block.
+# Many particles in flight around a small plant would pack it into a blob rather than let it branch, so the number
+# of particles starts at particle_count and grows with the plant, up to voxel_particle_count.
+#
+# The volume is kept in a sparse voxel store: 16x16x16 chunks of flags, allocated only where the plant (or the sticky
+# shell around it) reaches, and stacked in one array so that lookups stay vectorized. A small dense directory maps
+# each chunk of the volume to its index in the stack, or -1 if it isn't allocated; memory follows the plant.
+
+VOXEL_CHUNK_SHIFT = 4
+VOXEL_CHUNK_SIZE = 1 << VOXEL_CHUNK_SHIFT
+VOXEL_OCCUPIED = 1 # part of the plant
+VOXEL_STICKY = 2 # part of, or next to, the plant; a particle that reaches it sticks
+
+NEIGHBOUR_OFFSETS_3D = np.array([(dx, dy, dz) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1) if (dx, dy, dz) != (0, 0, 0)], dtype=np.int64)
+
+# the movement strategies that apply the same everywhere, which are the ones the voxel walk supports
+VOXEL_MOVEMENT_STRATEGIES = ('FULL_RANDOM_DRIFT', 'GRAVITY', 'WIND')
+
+# how many plant voxels per particle in flight, once the plant outgrows particle_count particles
+VOXELS_PER_PARTICLE = 16
+
+##################################
+# SPARSE VOXEL STORE
+
+def setup_voxel_store(size):
+    """
+    Create an empty sparse voxel store.
+
+    Parameters:
+    - size: the (width, height, depth) of the volume
+
+    Returns:
+    - a dict holding 'size', 'directory' (the chunk index of each chunk of the volume, -1 where not allocated), 'chunks' (the stacked chunks of flags), and 'chunk_count' (how many of the stacked chunks are in use)
+    """
+    directory_shape = tuple(-(-extent // VOXEL_CHUNK_SIZE) for extent in size)
+    return {'size': tuple(size),
+            'directory': np.full(directory_shape, -1, dtype=np.int32),
+            'chunks': np.zeros((16, VOXEL_CHUNK_SIZE, VOXEL_CHUNK_SIZE, VOXEL_CHUNK_SIZE), dtype=np.uint8),
+            'chunk_count': 0}
+
+def get_voxel_flags(voxel_store, voxels):
+    """
+    Get the flags of voxels of the store; voxels in chunks that aren't allocated have no flags.
+
+    Parameters:
+    - voxel_store: the sparse voxel store (see setup_voxel_store)
+    - voxels: an (n,3) integer numpy array of (x,y,z) voxels, all within the volume
+
+    Returns:
+    - a uint8 numpy array of the flags of each voxel
+    """
+    # NOTE: flat (np.take) indexing of the directory and the chunk stack is much faster than indexing by coordinate arrays
+    directory = voxel_store['directory']
+    _, directory_rows, directory_columns = directory.shape
+    chunk_coords = voxels >> VOXEL_CHUNK_SHIFT
+    chunk_indexes = np.take(directory, (chunk_coords[:, 0] * directory_rows + chunk_coords[:, 1]) * directory_columns + chunk_coords[:, 2])
+    local = voxels & (VOXEL_CHUNK_SIZE - 1)
+    offsets = (local[:, 0] << (2 * VOXEL_CHUNK_SHIFT)) | (local[:, 1] << VOXEL_CHUNK_SHIFT) | local[:, 2]
+    flags = np.take(voxel_store['chunks'], np.maximum(chunk_indexes, 0).astype(np.int64) * VOXEL_CHUNK_SIZE ** 3 + offsets)
+    return np.where(chunk_indexes >= 0, flags, 0).astype(np.uint8)
+
+def set_voxel_flags(voxel_store, voxels, flags):
+    """
+    Set flags on voxels of the store (keeping their other flags), allocating chunks as needed.
+
+    Parameters:
+    - voxel_store: the sparse voxel store (see setup_voxel_store); updated in place
+    - voxels: an (n,3) integer numpy array of (x,y,z) voxels, all within the volume
+    - flags: the flags to set, e.g. VOXEL_OCCUPIED | VOXEL_STICKY
+
+    Returns:
+    - None
+    """
+    if len(voxels) == 0:
+        return
+    directory = voxel_store['directory']
+    chunk_coords = voxels >> VOXEL_CHUNK_SHIFT
+    touched = np.unique(chunk_coords, axis=0)
+    new_chunks = touched[directory[tuple(touched.T)] < 0]
+    if len(new_chunks):
+        chunk_count = voxel_store['chunk_count']
+        needed = chunk_count + len(new_chunks)
+        if needed > len(voxel_store['chunks']):
+            grown = np.zeros((max(needed, 2 * len(voxel_store['chunks'])),) + voxel_store['chunks'].shape[1:], dtype=np.uint8)
+            grown[:chunk_count] = voxel_store['chunks'][:chunk_count]
+            voxel_store['chunks'] = grown
+        directory[tuple(new_chunks.T)] = np.arange(chunk_count, needed)
+        voxel_store['chunk_count'] = needed
+
+    chunk_indexes = directory[tuple(chunk_coords.T)]
+    local = voxels & (VOXEL_CHUNK_SIZE - 1)
+    index = (chunk_indexes, local[:, 0], local[:, 1], local[:, 2])
+    voxel_store['chunks'][index] |= flags
+
+def get_voxel_store_nbytes(voxel_store):
+    """
+    Get the memory held by the chunks of the store that are in use, and by its directory.
+
+    Parameters:
+    - voxel_store: the sparse voxel store (see setup_voxel_store)
+
+    Returns:
+    - the number of bytes
+    """
+    return voxel_store['chunk_count'] * VOXEL_CHUNK_SIZE ** 3 + voxel_store['directory'].nbytes
+
+def get_occupied_voxels(voxel_store):
+    """
+    Get all the voxels of the plant.
+
+    Parameters:
+    - voxel_store: the sparse voxel store (see setup_voxel_store)
+
+    Returns:
+    - an (n,3) integer numpy array of (x,y,z) voxels
+    """
+    chunk_coords = np.argwhere(voxel_store['directory'] >= 0)
+    chunk_indexes = voxel_store['directory'][tuple(chunk_coords.T)]
+    occupied = [np.argwhere(voxel_store['chunks'][index] & VOXEL_OCCUPIED) + coords * VOXEL_CHUNK_SIZE
+                for coords, index in zip(chunk_coords, chunk_indexes)]
+    return np.concatenate(occupied) if occupied else np.zeros((0, 3), dtype=np.int64)
+
+def deposit_voxels(voxel_store, voxels):
+    """
+    Make voxels part of the plant: they are flagged occupied, and they and their 26 neighbours are flagged sticky.
+
+    Parameters:
+    - voxel_store: the sparse voxel store (see setup_voxel_store); updated in place
+    - voxels: an (n,3) integer numpy array of (x,y,z) voxels, all within the volume
+
+    Returns:
+    - None
+    """
+    set_voxel_flags(voxel_store, voxels, VOXEL_OCCUPIED | VOXEL_STICKY)
+    neighbours = np.unique((voxels[:, None, :] + NEIGHBOUR_OFFSETS_3D).reshape(-1, 3), axis=0)
+    in_volume = ((neighbours >= 0) & (neighbours < voxel_store['size'])).all(axis=1)
+    set_voxel_flags(voxel_store, neighbours[in_volume], VOXEL_STICKY)
+
+##################################
+# GROWTH
+
+def setup_voxel_seed(voxel_store, seed_center, seed_radius):
+    """
+    Set up a round seed: the voxels of the volume within the seed radius of the seed center.
+
+    Parameters:
+    - voxel_store: the sparse voxel store (see setup_voxel_store); updated in place
+    - seed_center: the (x,y,z) center of the seed
+    - seed_radius: the radius of the seed
+
+    Returns:
+    - an (n,3) integer numpy array of the seed voxels
+    """
+    span = np.arange(-seed_radius, seed_radius + 1)
+    offsets = np.stack(np.meshgrid(span, span, span, indexing='ij'), axis=-1).reshape(-1, 3)
+    seed = offsets[(offsets * offsets).sum(axis=1) <= seed_radius * seed_radius] + np.array(seed_center)
+    seed = seed[((seed >= 0) & (seed < voxel_store['size'])).all(axis=1)]
+    deposit_voxels(voxel_store, seed)
+    return seed
+
+def get_voxel_move_weights(movement_strategy, bias_strength, wind_direction):
+    """
+    Get the weight of each of the 26 neighbour moves for a movement strategy; the 3D counterpart of pg.get_bias_move_weights.
+
+    Parameters:
+    - movement_strategy: one of VOXEL_MOVEMENT_STRATEGIES
+    - bias_strength: how strong the bias is; 0 is no bias
+    - wind_direction: the (dx,dy) direction of the WIND strategy, in the x,y plane
+
+    Returns:
+    - a numpy array of probabilities, one for each of NEIGHBOUR_OFFSETS_3D
+    """
+    if movement_strategy not in VOXEL_MOVEMENT_STRATEGIES:
+        raise ValueError(f"The voxel mode supports the {', '.join(VOXEL_MOVEMENT_STRATEGIES)} movement strategies, not {movement_strategy}")
+    bias_direction = {'FULL_RANDOM_DRIFT': (0, 0, 0), 'GRAVITY': (0, 1, 0), 'WIND': (wind_direction[0], wind_direction[1], 0)}[movement_strategy]
+    bias_length = math.sqrt(sum(v * v for v in bias_direction))
+    if bias_length == 0:
+        weights = np.ones(len(NEIGHBOUR_OFFSETS_3D))
+    else:
+        cosines = NEIGHBOUR_OFFSETS_3D @ (np.array(bias_direction) / bias_length) / np.linalg.norm(NEIGHBOUR_OFFSETS_3D, axis=1)
+        weights = np.exp(bias_strength * cosines)
+    return weights / weights.sum()
+
+def injected_particles_shell(voxel_store, count, inject_center, inner_radius, outer_radius, rng):
+    """
+    Get particles injected at random points of a spherical shell, within the volume and clear of the plant.
+
+    Parameters:
+    - voxel_store: the sparse voxel store (see setup_voxel_store)
+    - count: how many particles to inject
+    - inject_center: the (x,y,z) center of the shell
+    - inner_radius: the inner radius of the shell
+    - outer_radius: the outer radius of the shell
+    - rng: a numpy random Generator
+
+    Returns:
+    - a (count,3) integer numpy array of (x,y,z) particles
+    """
+    particles = np.zeros((0, 3), dtype=np.int64)
+    while len(particles) < count:
+        # NOTE: as for the 2D ring, the radius is uniform, so particles are denser toward the inside of the shell
+        directions = rng.normal(size=(count, 3))
+        directions /= np.maximum(np.linalg.norm(directions, axis=1, keepdims=True), 1e-12)
+        radii = rng.uniform(inner_radius, outer_radius, size=(count, 1))
+        candidates = np.rint(np.array(inject_center) + directions * radii).astype(np.int64)
+        candidates = candidates[((candidates >= 0) & (candidates < voxel_store['size'])).all(axis=1)]
+        candidates = candidates[get_voxel_flags(voxel_store, candidates) == 0]
+        particles = np.concatenate([particles, candidates])
+    return particles[:count]
+
+def grow_plant_voxel(plant_genetics, on_growth=None, rng=None):
+    """
+    Grow a voxel plant from a round seed at the bottom center of the volume.
+
+    Parameters:
+    - plant_genetics: the compiled configuration of how the plant grows (see genetics.compile_plant_genetics); depth is the third extent of the volume, voxel_particle_count the most particles stepped together, and voxel_walk_block_steps the steps per walk block
+    - on_growth: an optional function called with the growth count after each walk block that grew, e.g. for progress logging
+    - rng: a numpy random Generator; by default, one seeded from the random module, so that random.seed makes the plant reproducible
+
+    Returns:
+    - (seed, deposits, voxel_store): the (n,3) integer numpy arrays of the seed voxels and of the grown voxels (in the order they grew, by walk block), and the voxel store holding the plant
+    """
+    if rng is None:
+        rng = np.random.default_rng(random.getrandbits(64))
+    size = (plant_genetics.width, plant_genetics.height, plant_genetics.depth)
+    seed_center = np.array((plant_genetics.width // 2, plant_genetics.height - 1, plant_genetics.depth // 2))
+    move_prob, move_alias = map(np.array, pg.build_alias_table(list(get_voxel_move_weights(plant_genetics.movement_strategy, plant_genetics.movement_bias_strength, plant_genetics.movement_wind_direction))))
+    unsigned_size = np.array(size, dtype=np.uint64)
+    block_steps, grow_amount = plant_genetics.voxel_walk_block_steps, plant_genetics.grow_amount
+    min_particle_count, max_particle_count = plant_genetics.particle_count, max(plant_genetics.particle_count, plant_genetics.voxel_particle_count)
+
+    voxel_store = setup_voxel_store(size)
+    seed = setup_voxel_seed(voxel_store, seed_center, plant_genetics.seed_radius)
+
+    plant_radius = plant_genetics.seed_radius
+    inject_inner_radius, inject_outer_radius, max_movement_radius = pg.get_particle_action_radii_from_base_radius(plant_radius, plant_genetics)
+    particles = injected_particles_shell(voxel_store, min_particle_count, seed_center, inject_inner_radius, inject_outer_radius, rng)
+
+    deposits = []
+    growth_counter = 0
+    while growth_counter < grow_amount:
+        particle_count = min(max_particle_count, max(min_particle_count, (len(seed) + growth_counter) // VOXELS_PER_PARTICLE))
+        if particle_count > len(particles):
+            particles = np.concatenate([particles, injected_particles_shell(voxel_store, particle_count - len(particles), seed_center, inject_inner_radius, inject_outer_radius, rng)])
+
+        # the path of each particle through the block, starting where it is; path[:, k] is where it is after k steps
+        # the moves are sampled from an alias table, as in pg.move_particles_batch
+        columns = rng.integers(0, len(NEIGHBOUR_OFFSETS_3D), size=(particle_count, block_steps))
+        moves = np.where(rng.random((particle_count, block_steps)) < move_prob[columns], columns, move_alias[columns])
+        steps = NEIGHBOUR_OFFSETS_3D[moves]
+        travelled = np.cumsum(steps, axis=1)
+        path = particles[:, None, :] + travelled - steps
+
+        offsets = path - seed_center
+        # NOTE: viewed as unsigned, a negative coordinate is huge, so one comparison per axis checks both ends of the volume
+        unsigned_path = path.view(np.uint64)
+        in_bounds = ((unsigned_path[:, :, 0] < unsigned_size[0]) & (unsigned_path[:, :, 1] < unsigned_size[1]) & (unsigned_path[:, :, 2] < unsigned_size[2])
+                     & (np.einsum('ijk,ijk->ij', offsets, offsets) <= max_movement_radius * max_movement_radius))
+        # a particle is gone from its first step out of bounds on, even if it would wander back in
+        alive = np.logical_and.accumulate(in_bounds, axis=1)
+        sticky = np.zeros(alive.shape, dtype=bool)
+        sticky[alive] = (get_voxel_flags(voxel_store, path[alive]) & VOXEL_STICKY) != 0
+
+        stuck = sticky.any(axis=1)
+        first_sticky = sticky.argmax(axis=1)
+        stuck_ids = np.nonzero(stuck)[0]
+        if len(stuck_ids):
+            # grow where each stuck particle first got sticky, earliest first, once per voxel, and not over the plant
+            stuck_ids = stuck_ids[np.argsort(first_sticky[stuck_ids], kind='stable')]
+            candidates = path[stuck_ids, first_sticky[stuck_ids]]
+            _, first_index = np.unique(candidates, axis=0, return_index=True)
+            candidates = candidates[np.sort(first_index)]
+            candidates = candidates[(get_voxel_flags(voxel_store, candidates) & VOXEL_OCCUPIED) == 0][:grow_amount - growth_counter]
+            if len(candidates):
+                deposit_voxels(voxel_store, candidates)
+                deposits.append(candidates)
+                growth_counter += len(candidates)
+
+                growth_radius = math.sqrt(((candidates - seed_center) ** 2).sum(axis=1).max())
+                if growth_radius > plant_radius:
+                    plant_radius = growth_radius
+                    inject_inner_radius, inject_outer_radius, max_movement_radius = pg.get_particle_action_radii_from_base_radius(plant_radius, plant_genetics)
+                if on_growth is not None:
+                    on_growth(growth_counter)
+
+        particles = particles + travelled[:, -1]
+        replaced = stuck | ~alive[:, -1]
+        if replaced.any():
+            particles[replaced] = injected_particles_shell(voxel_store, int(replaced.sum()), seed_center, inject_inner_radius, inject_outer_radius, rng)
+
+    return seed, (np.concatenate(deposits) if deposits else np.zeros((0, 3), dtype=np.int64)), voxel_store
+
+##################################
+# OUTPUT
+
+def save_voxels_ply(voxels, ply_path, height, color):
+    """
+    Save voxels as a binary PLY point cloud, one colored vertex per voxel. The y axis is flipped, so that +y is up as most 3D tools expect.
+
+    Parameters:
+    - voxels: an (n,3) integer numpy array of (x,y,z) voxels
+    - ply_path: the path to save to
+    - height: the height of the volume
+    - color: the (r,g,b) color of the voxels
+
+    Returns:
+    - None
+    """
+    vertices = np.zeros(len(voxels), dtype=[('x', '<f4'), ('y', '<f4'), ('z', '<f4'), ('red', 'u1'), ('green', 'u1'), ('blue', 'u1')])
+    vertices['x'], vertices['y'], vertices['z'] = voxels[:, 0], height - 1 - voxels[:, 1], voxels[:, 2]
+    vertices['red'], vertices['green'], vertices['blue'] = color
+    header = ("ply\n"
+              "format binary_little_endian 1.0\n"
+              "comment digiplant voxel plant, one vertex per voxel\n"
+              f"element vertex {len(voxels)}\n"
+              "property float x\nproperty float y\nproperty float z\n"
+              "property uchar red\nproperty uchar green\nproperty uchar blue\n"
+              "end_header\n")
+    with open(ply_path, 'wb') as stream:
+        stream.write(header.encode('ascii'))
+        stream.write(vertices.tobytes())
+
+def render_voxel_projection(voxels, width, height, depth, bg_color, plant_color):
+    """
+    Render a side view of voxels, looking along +z; nearer voxels are drawn brighter.
+
+    Parameters:
+    - voxels: an (n,3) integer numpy array of (x,y,z) voxels
+    - width: the width of the volume
+    - height: the height of the volume
+    - depth: the depth of the volume
+    - bg_color: the (r,g,b,a) background color
+    - plant_color: the (r,g,b) color of the plant
+
+    Returns:
+    - an RGBA image of size (width, height)
+    """
+    nearest = np.full((height, width), depth, dtype=np.int64)
+    np.minimum.at(nearest, (voxels[:, 1], voxels[:, 0]), voxels[:, 2])
+    shown = nearest < depth
+    shade = 0.35 + 0.65 * (1 - nearest / max(1, depth - 1))
+    pixels = np.empty((height, width, 4), dtype=np.uint8)
+    pixels[:, :] = bg_color
+    pixels[shown, :3] = np.rint(np.array(plant_color) * shade[shown][:, None]).astype(np.uint8)
+    pixels[shown, 3] = 255
+    return Image.fromarray(pixels, 'RGBA')
+
+##################################
+# BENCHMARK
+
+def benchmark(deposit_count, genetics_path=gn.PLANT_GENETICS_DEFAULT_PATH, seed=0):
+    """
+    Measure the growth rate of the voxel mode, in deposits/sec, over a plant of the given size.
+
+    Parameters:
+    - deposit_count: how many voxels to grow
+    - genetics_path: the path of the plant genetics yaml file
+    - seed: the random seed
+
+    Returns:
+    - the overall deposits/sec
+    """
+    plant_genetics = gn.load_plant_genetics(genetics_path, grow_amount=deposit_count)
+    random.seed(seed)
+    progress = {'tmark': time.time(), 'count': 0}
+    report_interval = max(1, deposit_count // 10)
+    def report(growth_counter):
+        if growth_counter // report_interval > progress['count'] // report_interval:
+            tmark = time.time()
+            rate = (growth_counter - progress['count']) / (tmark - progress['tmark'])
+            print(f"{growth_counter} voxels: {rate:.0f} deposits/sec")
+            progress['tmark'], progress['count'] = tmark, growth_counter
+
+    tmark_start = time.time()
+    _, deposits, voxel_store = grow_plant_voxel(plant_genetics, report)
+    elapsed_s = time.time() - tmark_start
+    dense_nbytes = plant_genetics.width * plant_genetics.height * plant_genetics.depth
+    print(f"grew {len(deposits)} voxels in {elapsed_s:.1f} s: {len(deposits) / elapsed_s:.0f} deposits/sec")
+    print(f"voxel store: {voxel_store['chunk_count']} chunks, {get_voxel_store_nbytes(voxel_store) / 2 ** 20:.1f} MB ({dense_nbytes / 2 ** 20:.1f} MB dense)")
+    return len(deposits) / elapsed_s
+
+
+def parse_args(argv):
+    """
+    Parse the command-line arguments
+
+    Parameters:
+    - argv: the list of command-line arguments, not including the script name
+
+    Returns:
+    - the parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the 3D voxel growth mode (grow voxel plants with: python bplant1.py --voxel)")
+    parser.add_argument("--genetics", default=gn.PLANT_GENETICS_DEFAULT_PATH, help="path to the plant genetics yaml file")
+    parser.add_argument("--benchmark", type=int, default=100000, metavar="DEPOSIT_COUNT", help="how many voxels to grow")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the random number generator")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    benchmark(args.benchmark, args.genetics, args.seed)